@@ -1,23 +1,175 @@
+import asyncio
 import json
 import os
-from typing import Dict, List
+from contextlib import asynccontextmanager
+from typing import Dict, List, Literal
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
+from core import (ActionExecutionStatus, ActionResultCache, ExecutionConflictError, ExecutionEventBus, ExecutionQueue, GeneratedAppStore, LLMResponseCache, LLMService, MarqoDatabase, QueueFullError,
+                  RateLimiter, ReactWriter, SkyvernService, SQLiteDatabase,
+                  WebsiteBlockManager, WebsiteFlowManager, metrics)
+
+# METRICS_ENABLED=1 serves Prometheus metrics on /metrics; OTEL_TRACING=1
+# exports spans over OTLP (OTEL_EXPORTER_OTLP_ENDPOINT and friends)
+if os.getenv("METRICS_ENABLED", "0") == "1" or os.getenv("OTEL_TRACING", "0") == "1":
+    metrics.enable(prometheus=os.getenv("METRICS_ENABLED", "0") == "1",
+                   tracing=os.getenv("OTEL_TRACING", "0") == "1",
+                   service_name=os.getenv("OTEL_SERVICE_NAME", "automation"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await execution_queue.start()
+    await execution_queue.recover()
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop(
+        float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5")))) if metrics.enabled else None
+    yield
+    if lag_monitor:
+        lag_monitor.cancel()
+    await execution_queue.close()
+    await react_writer.close()
+    # Release pooled connections on shutdown
+    await skyvern.close()
+    await llm.close()
+    metrics.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Initialize services; STORAGE_BACKEND=sqlite keeps CRUD in SQLite and
+# uses Marqo only for semantic search (or not at all with SQLITE_SEMANTIC_SEARCH=0)
+marqo_db = MarqoDatabase(url=os.getenv("MARQO_URL", 'http://localhost:8882'))
+if os.getenv("STORAGE_BACKEND", "marqo") == "sqlite":
+    db = SQLiteDatabase(
+        path=os.getenv("SQLITE_PATH", "automation.db"),
+        semantic=marqo_db if os.getenv("SQLITE_SEMANTIC_SEARCH", "1") == "1" else None)
+else:
+    db = marqo_db
+llm_cache = LLMResponseCache(
+    max_size=int(os.getenv("LLM_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+    semantic_db=marqo_db if os.getenv("LLM_SEMANTIC_CACHE", "0") == "1" else None,
+    similarity_threshold=float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.97"))
+)
+
 
-from core import (LLMService, MarqoDatabase, ReactWriter, SkyvernService,
-                  WebsiteBlockManager, WebsiteFlowManager)
+def rate_limiter(name: str, prefix: str, max_concurrency: str) -> RateLimiter:
+    """Provider limits from <PREFIX>_MAX_CONCURRENCY, _RATE (requests/s), _BURST and _MAX_RETRIES."""
+    rate = os.getenv(f"{prefix}_RATE")
+    burst = os.getenv(f"{prefix}_BURST")
+    return RateLimiter(
+        name,
+        max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", max_concurrency)),
+        rate=float(rate) if rate else None,
+        burst=int(burst) if burst else None,
+        max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", "3"))
+    )
 
-app = FastAPI()
 
-# Initialize services with SQLite
-db = MarqoDatabase(url='http://localhost:8882')
-llm = LLMService(api_key=os.getenv("ANTHROPIC_API_KEY"))
-skyvern = SkyvernService(api_key=os.getenv("SKYVERN_API_KEY"))
+llm = LLMService(
+    api_key=os.getenv("ANTHROPIC_API_KEY"),
+    base_url=os.getenv("ANTHROPIC_BASE_URL"),
+    timeout=float(os.getenv("LLM_TIMEOUT", "120")),
+    cache=llm_cache,
+    limiter=rate_limiter("anthropic", "LLM", "8")
+)
+skyvern = SkyvernService(
+    api_key=os.getenv("SKYVERN_API_KEY"),
+    base_url=os.getenv("SKYVERN_BASE_URL", "https://api.skyvern.com/api/v1"),
+    max_connections=int(os.getenv("SKYVERN_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("SKYVERN_MAX_KEEPALIVE", "20")),
+    webhook_callback_url=os.getenv("SKYVERN_WEBHOOK_URL"),
+    webhook_fallback_delay=float(os.getenv("SKYVERN_WEBHOOK_FALLBACK", "120")),
+    limiter=rate_limiter("skyvern", "SKYVERN", "20")
+)
 block_manager = WebsiteBlockManager(db, llm)
-flow_manager = WebsiteFlowManager(db, block_manager, skyvern, llm)
-react_writer = ReactWriter(llm)
+execution_events = ExecutionEventBus()
+# ACTION_RESULT_CACHE=1 reuses results of identical action runs for each
+# action's result_ttl (ACTION_RESULT_TTL for actions without one)
+action_result_cache = ActionResultCache(
+    max_size=int(os.getenv("ACTION_RESULT_CACHE_SIZE", "1024")),
+    default_ttl=float(os.getenv("ACTION_RESULT_TTL", "0"))
+) if os.getenv("ACTION_RESULT_CACHE", "0") == "1" else None
+flow_manager = WebsiteFlowManager(
+    db, block_manager, skyvern, llm,
+    max_parallel_actions=int(os.getenv("FLOW_MAX_PARALLEL_ACTIONS", "5")),
+    max_concurrent_actions=int(os.getenv("MAX_CONCURRENT_ACTIONS", "50")),
+    planner=os.getenv("FLOW_PLANNER", "pipeline"),
+    planning_concurrency=int(os.getenv("FLOW_PLANNING_CONCURRENCY", "4")),
+    events=execution_events,
+    result_cache=action_result_cache
+)
+# Generated result apps, kept for the GENERATED_APPS_MAX most recently used executions
+generated_apps = GeneratedAppStore(
+    root=os.getenv("GENERATED_APPS_DIR", "generated_apps"),
+    max_executions=int(os.getenv("GENERATED_APPS_MAX", "1000"))
+)
+# Outputs matching the actions' declared schemas render from templates;
+# REACT_LLM_POLISH=1 still has Claude write a replacement afterwards
+react_writer = ReactWriter(llm, generated_apps, events=execution_events,
+                           polish=os.getenv("REACT_LLM_POLISH", "0") == "1")
+
+
+async def run_execution_job(job: Dict) -> None:
+    if job["prompt"]:
+        # Progress streams stay open for the app generated after the run
+        react_writer.expect(job["id"])
+    try:
+        await execute_job(job)
+    except Exception as e:
+        if job["prompt"]:
+            # No app is coming, so /executions/{id}/app answers 404, not 409
+            react_writer.abandon(job["id"], f"Execution failed: {str(e) or type(e).__name__}")
+        raise
+
+
+async def execute_job(job: Dict) -> None:
+    initial_inputs = job["initial_inputs"]
+    flow_id = job["flow_id"]
+    if job["prompt"] and not flow_id:
+        flow = await flow_manager.create_flow_from_prompt(
+            prompt=job["prompt"],
+            initial_inputs=initial_inputs,
+            planner=job.get("planner")
+        )
+        flow_id = flow["id"]
+
+    flow_execution = await flow_manager.execute_flow(
+        flow_id=flow_id,
+        initial_inputs=initial_inputs,
+        execution_id=job["id"],
+        # Executions recovered after a restart continue from their checkpoints
+        resume=job.get("resume", False)
+    )
+
+    if job["prompt"]:
+        # Combine execution outputs with original prompt for React code generation
+        action_outputs = {}
+        for action_execution in flow_execution.to_dict()["action_executions"]:
+            if isinstance(action_execution["output"], dict):
+                action_outputs.update(action_execution["output"])
+
+        declared_schema = {}
+        actions = await block_manager.get_actions(
+            [action_execution.action_id for action_execution in flow_execution.action_executions])
+        for action in actions.values():
+            if isinstance(action.get("output_schema"), dict):
+                declared_schema.update(action["output_schema"])
+
+        # Generated in the background so the worker can take the next job
+        react_writer.start(job["id"], job["prompt"], action_outputs, declared_schema)
+
+
+execution_queue = ExecutionQueue(
+    db, run_execution_job,
+    workers=int(os.getenv("EXECUTION_WORKERS", "4")),
+    max_queue=int(os.getenv("EXECUTION_QUEUE_SIZE", "100")),
+    events=execution_events
+)
 
 # Request/Response Models
 app.add_middleware(
@@ -25,7 +177,8 @@ app.add_middleware(
     allow_origins=["*"],  # Allows all origins during development
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
-    allow_headers=["*"]   # Allows all headers
+    allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"]
 )
 
 
@@ -41,6 +194,10 @@ class FlowCreate(BaseModel):
     action_configs: List[Dict]
 
 
+class ActionUpdate(BaseModel):
+    result_ttl: float = Field(ge=0)
+
+
 class FlowExecute(BaseModel):
     initial_inputs: Dict
 
@@ -48,6 +205,36 @@ class FlowExecute(BaseModel):
 class FlowPrompt(BaseModel):
     prompt: str
     initial_inputs: Dict | None = None
+    planner: Literal["pipeline", "single_pass"] | None = None
+
+async def list_collection(collection: str, response: Response, limit: int,
+                          cursor: str | None, fields: str | None, format: str):
+    """Shared handler of the list endpoints.
+
+    JSON responses carry the next page's cursor in the X-Next-Cursor header;
+    format=ndjson streams every page from the cursor on, one document per line.
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        items, next_cursor = await db.list_page(collection, limit, cursor, field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        async def stream_pages():
+            page, page_cursor = items, next_cursor
+            while True:
+                for item in page:
+                    yield json.dumps(item, default=str) + "\n"
+                if not page_cursor:
+                    break
+                page, page_cursor = await db.list_page(collection, limit, page_cursor, field_list)
+
+        return StreamingResponse(stream_pages(), media_type="application/x-ndjson")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 # Block endpoints
 
@@ -63,41 +250,47 @@ async def create_block(block_data: BlockCreate):
 
 
 @app.get("/blocks/{block_id}")
-def get_block(block_id: str):
-    result = db.client.index(db.blocks_index).get_document(block_id)
+async def get_block(block_id: str):
+    result = await db.get_block(block_id)
     if not result:
         raise HTTPException(status_code=404, detail="Block not found")
     return result
 
 
 @app.get("/blocks/")
-def list_blocks():
-    results = db.client.index(db.blocks_index).search(
-        q="*",
-        limit=100
-    )
-    return [hit for hit in results["hits"]]
+async def list_blocks(response: Response, limit: int = Query(100, ge=1, le=1000),
+                      cursor: str | None = None, fields: str | None = None,
+                      format: str = "json"):
+    return await list_collection("blocks", response, limit, cursor, fields, format)
 
 # Action endpoints
 
 
 @app.get("/actions/{action_id}")
-def get_action(action_id: str):
-    result = db.client.index(db.actions_index).get_document(action_id)
+async def get_action(action_id: str):
+    result = await db.get_action(action_id)
     if not result:
         raise HTTPException(status_code=404, detail="Action not found")
     return result
 
+
+@app.patch("/actions/{action_id}")
+async def update_action(action_id: str, action_data: ActionUpdate):
+    if not await db.get_action(action_id):
+        raise HTTPException(status_code=404, detail="Action not found")
+    await block_manager.update_action(action_id, action_data.model_dump())
+    if action_result_cache:
+        action_result_cache.invalidate_action(action_id)
+    return await db.get_action(action_id)
+
 # get actions by block id
 
 
 @app.get("/actions/")
-def list_actions():
-    results = db.client.index(db.actions_index).search(
-        q="*",
-        limit=100
-    )
-    return [hit for hit in results["hits"]]
+async def list_actions(response: Response, limit: int = Query(100, ge=1, le=1000),
+                       cursor: str | None = None, fields: str | None = None,
+                       format: str = "json"):
+    return await list_collection("actions", response, limit, cursor, fields, format)
 
 # Flow endpoints
 
@@ -113,104 +306,217 @@ def create_flow(flow_data: FlowCreate):
 
 
 @app.get("/flows/{flow_id}")
-def get_flow(flow_id: str):
-    result = db.client.index(db.flows_index).get_document(flow_id)
+async def get_flow(flow_id: str):
+    result = await db.get_flow(flow_id)
     if not result:
         raise HTTPException(status_code=404, detail="Flow not found")
-    result["actions"] = json.loads(result["actions"])
     return result
 
 
 @app.get("/flows/")
-def list_flows():
-    results = db.client.index(db.flows_index).search(
-        q="*",
-        limit=100
-    )
-    return [{**hit, "actions": json.loads(hit["actions"])} for hit in results["hits"]]
+async def list_flows(response: Response, limit: int = Query(100, ge=1, le=1000),
+                     cursor: str | None = None, fields: str | None = None,
+                     format: str = "json"):
+    return await list_collection("flows", response, limit, cursor, fields, format)
 
 
-@app.post("/flows/{flow_id}/execute")
-async def execute_flow(flow_id: str, execution_data: FlowExecute):
+async def enqueue_execution(flow_id: str | None, initial_inputs: Dict | None,
+                            prompt: str | None = None, resume: Dict | None = None,
+                            planner: str | None = None) -> Dict:
     try:
-        flow_execution = await flow_manager.execute_flow(
-            flow_id=flow_id,
-            initial_inputs=execution_data.initial_inputs
-        )
-        return flow_execution.to_dict()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        job = await execution_queue.submit(flow_id, initial_inputs or {}, prompt=prompt,
+                                           resume=resume, planner=planner)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": "30"})
+    except ExecutionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"execution_id": job["id"], "status": "queued"}
+
+
+@app.post("/flows/{flow_id}/execute", status_code=202)
+async def execute_flow(flow_id: str, execution_data: FlowExecute):
+    return await enqueue_execution(flow_id, execution_data.initial_inputs)
 
 
 @app.get("/executions/{execution_id}")
-def get_execution(execution_id: str):
-    result = db.client.index(db.executions_index).get_document(execution_id)
+async def get_execution(execution_id: str):
+    result = await db.get_execution(execution_id)
     if not result:
         raise HTTPException(status_code=404, detail="Execution not found")
-    result["initial_inputs"] = json.loads(result["initial_inputs"])
-    result["action_executions"] = json.loads(result["action_executions"])
     return result
 
 
+@app.get("/executions/{execution_id}/app")
+async def get_execution_app(execution_id: str, request: Request):
+    """The React app generated for an execution, as one JSON document.
+
+    ``component`` is the App.jsx source and ``data`` the document it imports
+    as ./data.json; cra/ mounts it at ``/?execution=<id>``. Both are content-addressed, so the ETag changes only
+    when either does and clients can revalidate with If-None-Match.
+    """
+    manifest = generated_apps.manifest(execution_id)
+    if manifest is None:
+        status = react_writer.status(execution_id)
+        if status in ("pending", "running"):
+            raise HTTPException(status_code=409, detail=f"App generation is {status}")
+        raise HTTPException(status_code=404, detail="App not found")
+
+    etag = f'"{manifest["component"][:16]}{manifest["data"][:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    component = await generated_apps.read(manifest["component"])
+    data = await generated_apps.read(manifest["data"])
+    if component is None or data is None:
+        raise HTTPException(status_code=404, detail="App not found")
+    # The data is stored serialized, so it is spliced in without a parse
+    body = (f'{{"execution_id":{json.dumps(execution_id)},'
+            f'"renderer":{json.dumps(manifest["renderer"])},'
+            f'"component":{json.dumps(component)},"data":{data}}}')
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/generated-apps/stats")
+def get_generated_app_stats():
+    return generated_apps.stats()
+
+
+FINISHED_STATUSES = {ActionExecutionStatus.COMPLETED.value, ActionExecutionStatus.FAILED.value}
+
+
+def sse_message(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/executions/{execution_id}/events")
+async def stream_execution_events(execution_id: str):
+    """Server-Sent Events stream of an execution's progress.
+
+    Starts with a snapshot of the stored execution, then pushes every
+    action and execution status change until the execution finishes. For
+    prompt executions it then streams the generated React code ("codegen"
+    events with code deltas) until the app is written.
+    """
+    # Subscribe before reading the snapshot so no transition is missed
+    subscriber = execution_events.subscribe(execution_id)
+    snapshot = await db.get_execution(execution_id)
+    if not snapshot:
+        execution_events.unsubscribe(execution_id, subscriber)
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+    def finished(status: str) -> bool:
+        if status == ActionExecutionStatus.COMPLETED.value and \
+                react_writer.status(execution_id) in ("pending", "running"):
+            return False
+        return status in FINISHED_STATUSES
+
+    async def event_stream():
+        try:
+            yield sse_message("snapshot", snapshot)
+            if finished(snapshot["status"]):
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_message(event["type"], event)
+                if event["type"] == "execution" and finished(event["status"]):
+                    return
+                if event["type"] == "codegen" and event.get("status") in FINISHED_STATUSES:
+                    return
+        finally:
+            execution_events.unsubscribe(execution_id, subscriber)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
 @app.get("/executions/")
-def list_executions():
-    results = db.client.index(db.executions_index).search(
-        q="*",
-        limit=100
-    )
-    return [{
-        **hit,
-        "initial_inputs": json.loads(hit["initial_inputs"]),
-        "action_executions": json.loads(hit["action_executions"])
-    } for hit in results["hits"]]
+async def list_executions(response: Response, limit: int = Query(100, ge=1, le=1000),
+                          cursor: str | None = None, fields: str | None = None,
+                          format: str = "json"):
+    return await list_collection("executions", response, limit, cursor, fields, format)
 
 
 @app.post("/flows/from-prompt")
 async def create_flow_from_prompt(flow_data: FlowPrompt):
     flow = await flow_manager.create_flow_from_prompt(
         prompt=flow_data.prompt,
-        initial_inputs=flow_data.initial_inputs
+        initial_inputs=flow_data.initial_inputs,
+        planner=flow_data.planner
     )
     return flow
 
 
-@app.post("/flows/new/from-prompt/execute")
+@app.post("/flows/new/from-prompt/execute", status_code=202)
 async def create_and_execute_flow_from_prompt(flow_data: FlowPrompt):
-    flow = await flow_manager.create_flow_from_prompt(
-        prompt=flow_data.prompt,
-        initial_inputs=flow_data.initial_inputs
-    )
-    flow_execution = await flow_manager.execute_flow(
-        flow_id=flow["id"],
-        initial_inputs=flow_data.initial_inputs
-    )
-    
-    # Combine execution outputs with original prompt for React code generation
-    execution_dict = flow_execution.to_dict()
-    action_outputs = {}
-    
-    for action_execution in execution_dict["action_executions"]:
-        if "outputs" in action_execution:
-            action_outputs.update(action_execution["outputs"])
-    
-    await react_writer.write_app_jsx(
-        prompt=flow_data.prompt,
-        unstructured_data=action_outputs
-    )
-    
-    return flow_execution.to_dict()
+    return await enqueue_execution(None, flow_data.initial_inputs,
+                                   prompt=flow_data.prompt, planner=flow_data.planner)
+
+
+@app.post("/webhooks/skyvern")
+async def skyvern_webhook(request: Request):
+    body = await request.body()
+    if os.getenv("SKYVERN_VERIFY_WEBHOOKS", "1") == "1":
+        if not skyvern.verify_webhook(body, request.headers.get("x-skyvern-signature")):
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body is not JSON")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Webhook body is not a JSON object")
+    resolved = skyvern.handle_webhook(payload)
+    return {"task_id": payload.get("task_id"), "accepted": resolved}
+
+
+@app.get("/llm/cache")
+def get_llm_cache_stats():
+    return llm_cache.stats()
+
+
+@app.get("/llm/stats")
+def get_llm_stats():
+    return {"usage": llm.usage, "stages": llm.stage_stats()}
+
+
+@app.get("/rate-limits")
+def get_rate_limits():
+    return {"anthropic": llm.limiter.stats(), "skyvern": skyvern.limiter.stats()}
+
+
+@app.get("/metrics")
+def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    # Gauges of state that is cheaper to read at scrape time than to track
+    for limiter in (llm.limiter, skyvern.limiter):
+        stats = limiter.stats()
+        metrics.set("rate_limiter_in_flight", stats["in_flight"], limiter=limiter.name)
+        metrics.set("rate_limiter_waiting", stats["waiting"], limiter=limiter.name)
+    metrics.set("skyvern_tasks_watched", len(skyvern.poller.entries))
+    metrics.set("execution_queue_depth", execution_queue.queue.qsize())
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/action-results/cache")
+def get_action_result_cache_stats():
+    if not action_result_cache:
+        return {"enabled": False}
+    return {"enabled": True, **action_result_cache.stats()}
 
 
 @app.get("/flows/pending")
 async def get_pending_flows():
-    # Query Marqo for pending flows
-    results = db.client.index(db.flows_index).search(
-        q="pending_input",
-        filter_expression="status = 'pending_input'"
-    )
+    pending_flows = await db.search_flows_by_status("pending_input", limit=1)
 
-    if results["hits"]:
-        pending_flow = results["hits"][0]
+    if pending_flows:
+        pending_flow = pending_flows[0]
         return {
             "flowId": pending_flow["_id"],
             "missingInputs": json.loads(pending_flow["missing_inputs"])
@@ -218,13 +524,23 @@ async def get_pending_flows():
     return {}
 
 
-@app.post("/flows/{flow_id}/continue")
-async def continue_flow(flow_id: str, inputs: Dict):
-    flow_execution = await flow_manager.continue_flow_execution(
-        flow_id=flow_id,
-        additional_inputs=inputs
-    )
-    return flow_execution.to_dict()
+@app.post("/flows/{flow_id}/continue", status_code=202)
+async def continue_flow(flow_id: str, inputs: Dict, execution_id: str | None = None):
+    """Queue the given (or the latest) failed execution of a flow to resume.
+
+    Completed actions keep their stored outputs and only the remaining ones
+    run, with ``inputs`` merged into the original inputs. A flow without a
+    failed execution is executed from scratch.
+    """
+    try:
+        execution = await flow_manager.resumable_execution(flow_id, execution_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ExecutionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    await db.update_flow(flow_id, {"status": ActionExecutionStatus.RUNNING})
+    return await enqueue_execution(flow_id, inputs, resume=execution)
 
 
 if __name__ == "__main__":
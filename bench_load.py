@@ -0,0 +1,241 @@
+"""Load test app.py end to end against the offline simulators.
+
+Starts the Skyvern and Anthropic simulators (simulators.py) as subprocesses,
+serves app.py in this process on a fresh SQLite database, and drives its
+endpoints at the given concurrency. Reports p50/p95/p99 latency and
+throughput per scenario, and the event-loop lag of the app process (which
+also runs the load generator).
+
+    python bench_load.py --scenario execute --requests 200 --concurrency 50
+    python bench_load.py --scenario from-prompt --planner single_pass --llm-latency 1
+
+Scenarios: execute (queue a stored flow and follow its progress stream until
+it finishes), from-prompt (plan a flow), list (read a page of flows).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+SKYVERN_KEY = "simulator"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+async def wait_until_up(url: str, timeout: float = 15) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+def start_simulator(service: str, port: int, *options: str) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), "simulators.py"),
+                             service, "--port", str(port), *options])
+
+
+async def monitor_lag(samples: list, interval: float = 0.05) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - start - interval, 0))
+
+
+async def seed_flows(db, count: int, actions_per_flow: int) -> list:
+    block_id = await db.store_block({"name": "Simulated shop", "type": "website_based",
+                                     "url": "https://shop.example.com"})
+    action_ids = await db.store_actions([{
+        "block_id": block_id,
+        "name": f"step {i}",
+        "navigation_goal": f"Open page {i}",
+        "data_extraction_goal": f"Extract the data of page {i}",
+        "required_inputs": [],
+        "output_schema": {},
+        "url": "https://shop.example.com"
+    } for i in range(actions_per_flow)])
+    return [await db.store_flow({
+        "name": f"load flow {n}",
+        "description": "load benchmark",
+        # A chain, so each step waits for the previous one
+        "actions": [{"id": action_id, "key": f"s{i}",
+                     "depends_on": [f"s{i - 1}"] if i else []}
+                    for i, action_id in enumerate(action_ids)]
+    }) for n in range(count)]
+
+
+async def run_execute(client: httpx.AsyncClient, flow_id: str, n: int) -> str:
+    response = await client.post(f"/flows/{flow_id}/execute",
+                                 json={"initial_inputs": {"query": f"item {n}"}})
+    response.raise_for_status()
+    execution_id = response.json()["execution_id"]
+    status = None
+    kind = None
+    async with client.stream("GET", f"/executions/{execution_id}/events") as events:
+        async for line in events.aiter_lines():
+            if line.startswith("event:"):
+                kind = line[6:].strip()
+            elif line.startswith("data:"):
+                event = json.loads(line[5:])
+                # The snapshot is the stored execution itself, without a type
+                if kind in ("snapshot", "execution"):
+                    status = event["status"]
+    if status != "completed":
+        raise RuntimeError(f"execution {execution_id} ended as {status}")
+    return status
+
+
+async def run_from_prompt(client: httpx.AsyncClient, planner: str, n: int) -> None:
+    response = await client.post("/flows/from-prompt", json={
+        "prompt": f"find the cheapest price of product {n}", "planner": planner})
+    response.raise_for_status()
+
+
+async def run_list(client: httpx.AsyncClient) -> None:
+    response = await client.get("/flows/", params={"limit": 50})
+    response.raise_for_status()
+
+
+async def drive(name: str, requests: int, concurrency: int, make_request) -> dict:
+    latencies, errors = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(n: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await make_request(n)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                kind = type(e).__name__
+                if isinstance(e, httpx.HTTPStatusError):
+                    kind = f"HTTP {e.response.status_code}"
+                errors[kind] = errors.get(kind, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {"name": name, "latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def report(result: dict, lag: list) -> None:
+    latencies = result["latencies"]
+    print(f"\n{result['name']}: {len(latencies)} ok, "
+          f"{sum(result['errors'].values())} failed {result['errors'] or ''}")
+    if latencies:
+        print(f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'req/s':>10}")
+        print(f"{percentile(latencies, 0.50) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.95) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.1f}"
+              f"{statistics.mean(latencies) * 1000:>10.1f}"
+              f"{len(latencies) / result['elapsed']:>10.1f}")
+    if lag:
+        print(f"event-loop lag ms: p50 {percentile(lag, 0.50) * 1000:.1f}  "
+              f"p99 {percentile(lag, 0.99) * 1000:.1f}  max {max(lag) * 1000:.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append",
+                        choices=["execute", "from-prompt", "list"])
+    parser.add_argument("-n", "--requests", type=int, default=100)
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("--actions-per-flow", type=int, default=3)
+    parser.add_argument("--planner", default="single_pass", choices=["pipeline", "single_pass"])
+    parser.add_argument("--task-seconds", type=float, default=2.0, help="median Skyvern task duration")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of failed Skyvern tasks")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="fraction of simulator requests answered with 429")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="median Claude reply time")
+    parser.add_argument("--webhooks", action="store_true",
+                        help="complete Skyvern tasks by webhook instead of polling")
+    args = parser.parse_args()
+    scenarios = args.scenario or ["execute"]
+
+    skyvern_port, anthropic_port, app_port = free_port(), free_port(), free_port()
+    throttling = ["--rate-limit-rate", str(args.rate_limit_rate), "--retry-after", "0.5"]
+    simulators = [
+        start_simulator("skyvern", skyvern_port, "--task-seconds", str(args.task_seconds),
+                        "--failure-rate", str(args.failure_rate), "--api-key", SKYVERN_KEY,
+                        *throttling),
+        start_simulator("anthropic", anthropic_port, "--latency", str(args.llm_latency),
+                        *throttling)
+    ]
+
+    # app.py reads its configuration at import time
+    os.environ.update({
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "load.db"),
+        "SQLITE_SEMANTIC_SEARCH": "0",
+        "SKYVERN_BASE_URL": f"http://127.0.0.1:{skyvern_port}/api/v1",
+        "SKYVERN_API_KEY": SKYVERN_KEY,
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{anthropic_port}",
+        "ANTHROPIC_API_KEY": "simulator",
+        "EXECUTION_QUEUE_SIZE": str(max(args.requests, 100)),
+        "EXECUTION_WORKERS": str(args.concurrency)
+    })
+    if args.webhooks:
+        os.environ["SKYVERN_WEBHOOK_URL"] = f"http://127.0.0.1:{app_port}/webhooks/skyvern"
+        os.environ["SKYVERN_WEBHOOK_FALLBACK"] = "30"
+    import uvicorn
+    import app
+
+    server = uvicorn.Server(uvicorn.Config(app.app, host="127.0.0.1", port=app_port,
+                                           log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    try:
+        await wait_until_up(f"http://127.0.0.1:{skyvern_port}/docs")
+        await wait_until_up(f"http://127.0.0.1:{anthropic_port}/docs")
+        await wait_until_up(f"http://127.0.0.1:{app_port}/docs")
+        flow_ids = await seed_flows(app.db, 10, args.actions_per_flow)
+
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}",
+                                     limits=limits, timeout=None) as client:
+            requests = {
+                "execute": lambda n: run_execute(client, flow_ids[n % len(flow_ids)], n),
+                "from-prompt": lambda n: run_from_prompt(client, args.planner, n),
+                "list": lambda n: run_list(client)
+            }
+            for scenario in scenarios:
+                lag = []
+                monitor = asyncio.create_task(monitor_lag(lag))
+                result = await drive(scenario, args.requests, args.concurrency, requests[scenario])
+                monitor.cancel()
+                report(result, lag)
+            print(f"\nrate limits: {(await client.get('/rate-limits')).json()}")
+            for stage, stats in (await client.get("/llm/stats")).json()["stages"].items():
+                print(f"llm {stage}: {stats}")
+    finally:
+        server.should_exit = True
+        await serving
+        for simulator in simulators:
+            simulator.terminate()
+            simulator.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""Compare the multi-stage planning pipeline with the single-pass planner.
+
+Plans each prompt with both planners, using the services configured the
+same way as app.py (same environment variables). Prints wall-clock time,
+LLM calls and input/output tokens per run, then tokens (including prompt
+cache reads) and latency per prompt stage. The LLM response cache is
+turned off so both planners pay for every call, and each planner gets its
+own empty SQLite database so neither reuses the blocks and actions the
+other created.
+
+    python bench_planner.py "cheapest flight from SFO to NYC next friday" -r 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from app import flow_manager, llm
+from core import SQLiteDatabase, WebsiteBlockManager, WebsiteFlowManager
+
+
+def fresh_flow_manager() -> WebsiteFlowManager:
+    """A flow manager like app.py's, on an empty database."""
+    db = SQLiteDatabase(path=os.path.join(tempfile.mkdtemp(), "planner.db"))
+    return WebsiteFlowManager(db, WebsiteBlockManager(db, llm), flow_manager.skyvern, llm,
+                              planning_concurrency=flow_manager.planning_concurrency)
+
+
+async def plan(manager: WebsiteFlowManager, prompt: str, planner: str) -> dict:
+    before = dict(llm.usage)
+    start = time.perf_counter()
+    error = None
+    try:
+        await manager.create_flow_from_prompt(prompt, {}, planner=planner)
+    except Exception as e:
+        error = str(e)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "error": error,
+        **{key: llm.usage[key] - before[key] for key in llm.usage}
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("prompts", nargs="+")
+    parser.add_argument("-r", "--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    llm.cache = None
+    print(f"{'planner':<12}{'runs':>6}{'mean s':>10}{'calls':>8}{'input tok':>12}{'output tok':>12}{'errors':>8}")
+    for planner in ("pipeline", "single_pass"):
+        manager = fresh_flow_manager()
+        runs = [await plan(manager, prompt, planner)
+                for prompt in args.prompts for _ in range(args.repeat)]
+        print(f"{planner:<12}{len(runs):>6}"
+              f"{statistics.mean(r['seconds'] for r in runs):>10.2f}"
+              f"{statistics.mean(r['calls'] for r in runs):>8.1f}"
+              f"{statistics.mean(r['input_tokens'] for r in runs):>12.0f}"
+              f"{statistics.mean(r['output_tokens'] for r in runs):>12.0f}"
+              f"{sum(1 for r in runs if r['error']):>8}")
+
+    print(f"\n{'stage':<16}{'calls':>7}{'input tok':>11}{'cached tok':>12}"
+          f"{'output tok':>12}{'mean s':>9}{'first tok s':>13}")
+    for stage, stats in llm.stage_stats().items():
+        print(f"{stage:<16}{stats['calls']:>7}"
+              f"{stats['input_tokens'] / stats['calls']:>11.0f}"
+              f"{stats['cache_read_input_tokens'] / stats['calls']:>12.0f}"
+              f"{stats['output_tokens'] / stats['calls']:>12.0f}"
+              f"{stats['mean_seconds']:>9.2f}{stats['mean_first_token_seconds']:>13.2f}")
+    await llm.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Compare the Marqo-only storage path against the SQLite backend.
+
+Runs the CRUD calls the API makes (flow writes/reads, list endpoints,
+execution header + step writes, execution reads) against both backends and
+prints mean / p95 latency per operation.
+
+    python bench_storage.py --marqo-url http://localhost:8882 -n 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from core import MarqoDatabase, SQLiteDatabase
+
+
+async def timed(samples, name, coro):
+    start = time.perf_counter()
+    result = await coro
+    samples.setdefault(name, []).append(time.perf_counter() - start)
+    return result
+
+
+async def run(db, n: int, steps: int):
+    samples = {}
+    flow_ids = []
+    for i in range(n):
+        flow_ids.append(await timed(samples, "store_flow", db.store_flow({
+            "name": f"bench flow {i}",
+            "description": "storage benchmark",
+            "actions": [{"id": str(uuid.uuid4())} for _ in range(steps)]
+        })))
+
+    for flow_id in flow_ids:
+        await timed(samples, "get_flow", db.get_flow(flow_id))
+
+        execution_id = await timed(samples, "store_execution", db.store_execution({
+            "flow_id": flow_id, "initial_inputs": {"query": "bench"}, "status": "running"
+        }))
+        for step in range(steps):
+            await timed(samples, "store_execution_step", db.store_execution_step(execution_id, {
+                "id": str(uuid.uuid4()), "step": step, "action_id": "a", "status": "completed",
+                "inputs": {"query": "bench"}, "output": {"price": step}
+            }))
+        await timed(samples, "update_execution", db.update_execution(
+            execution_id, {"status": "completed", "step_count": steps}))
+        await timed(samples, "get_execution", db.get_execution(execution_id))
+
+    for _ in range(max(n // 10, 1)):
+        await timed(samples, "list_flows", db.list_flows(limit=100))
+        await timed(samples, "list_executions", db.list_executions(limit=100))
+    return samples
+
+
+def report(label, samples):
+    print(f"\n{label}")
+    print(f"{'operation':<24}{'count':>8}{'mean ms':>12}{'p95 ms':>12}")
+    for name, values in samples.items():
+        values = sorted(values)
+        p95 = values[min(int(len(values) * 0.95), len(values) - 1)]
+        print(f"{name:<24}{len(values):>8}{statistics.mean(values) * 1000:>12.2f}{p95 * 1000:>12.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--marqo-url", default="http://localhost:8882")
+    parser.add_argument("--sqlite-path", default=None)
+    parser.add_argument("-n", type=int, default=100, help="flows/executions per backend")
+    parser.add_argument("--steps", type=int, default=5, help="action steps per execution")
+    parser.add_argument("--skip-marqo", action="store_true")
+    args = parser.parse_args()
+
+    sqlite_path = args.sqlite_path or os.path.join(tempfile.mkdtemp(), "bench.db")
+    report(f"sqlite ({sqlite_path})", await run(SQLiteDatabase(path=sqlite_path), args.n, args.steps))
+
+    if not args.skip_marqo:
+        marqo_db = MarqoDatabase(url=args.marqo_url)
+        marqo_db.init_db()
+        report(f"marqo ({args.marqo_url})", await run(marqo_db, args.n, args.steps))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
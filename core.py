@@ -1,14 +1,26 @@
 import asyncio
+import base64
+import contextvars
+import heapq
+import hashlib
+import hmac
 import json
 import os
+import queue
+import random
 import sqlite3
+import time
 import uuid
-from contextlib import contextmanager
-from dataclasses import asdict, dataclass
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from enum import Enum
+from itertools import count
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
 
 import anthropic
 import httpx
@@ -26,7 +38,12 @@ class TaskStatus(str, Enum):
     CANCELED = "canceled"
 
 
+TERMINAL_TASK_STATUSES = {TaskStatus.COMPLETED, TaskStatus.FAILED,
+                          TaskStatus.TERMINATED, TaskStatus.CANCELED}
+
+
 class ActionExecutionStatus(str, Enum):
+    QUEUED = "queued"
     PENDING = "pending"
     RUNNING = "running"
     COMPLETED = "completed"
@@ -35,49 +52,450 @@ class ActionExecutionStatus(str, Enum):
 
 
 
+# Public suffixes made of two labels, enough for the sites flows target
+MULTI_PART_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "com.au", "net.au", "org.au",
+    "co.jp", "co.in", "co.nz", "co.za", "com.br", "com.mx", "com.sg", "com.cn"
+}
+
+
+def normalize_host(url: str) -> str:
+    """Lower-cased host of a URL without scheme, port or leading www."""
+    if "//" not in url:
+        url = "//" + url
+    host = (urlsplit(url.strip()).hostname or "").lower().rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+def registrable_domain(url: str) -> str:
+    """Approximate registrable domain, e.g. maps.google.co.uk -> google.co.uk."""
+    labels = normalize_host(url).split(".")
+    if len(labels) > 2 and ".".join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def encode_cursor(position) -> str:
+    """Opaque pagination cursor for a JSON-serializable position."""
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+# JSON-encoded document fields and their value when empty
+JSON_FIELDS = {
+    "flows": {"actions": "[]"},
+    "executions": {"initial_inputs": "{}"}
+}
+
+
+def _decode_document(collection: str, document: Dict) -> Dict:
+    document = dict(document)
+    for field_name, empty in JSON_FIELDS.get(collection, {}).items():
+        if isinstance(document.get(field_name), str):
+            document[field_name] = json.loads(document[field_name] or empty)
+    return document
+
+
+def _project(document: Dict, fields: Optional[List[str]]) -> Dict:
+    if fields is None:
+        return document
+    return {"_id": document["_id"], **{f: document[f] for f in fields if f in document}}
+
+
+def _plain(value):
+    """Unwrap enum members so sqlite3 stores their plain value."""
+    return value.value if isinstance(value, Enum) else value
+
+
+def _decode_step(document: Dict) -> Dict:
+    """Turn a stored execution step record back into an action execution dict."""
+    return {
+        "id": document["action_execution_id"],
+        "step": document["step"],
+        "action_id": document["action_id"],
+        "inputs": json.loads(document["inputs"]),
+        "status": document["status"],
+        "skyvern_task_id": document["skyvern_task_id"] or None,
+        "output": json.loads(document["output"]),
+        "error": document["error"] or None,
+        "started_at": document["started_at"] or None,
+        "completed_at": document["completed_at"] or None,
+        "cache_hit": bool(document.get("cache_hit")),
+        "node_key": document.get("node_key") or None
+    }
+
+
+# Histogram buckets (seconds) of provider calls, browser tasks and whole runs
+LONG_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+class Metrics:
+    """Prometheus metrics and OpenTelemetry spans of the pipeline's hot paths.
+
+    Everything is off until ``enable``: recording methods then return after
+    one attribute check and ``timed`` hands out a shared no-op context
+    manager, so instrumented code costs next to nothing. Metric labels are
+    kept low-cardinality; IDs only go into span attributes.
+    """
+
+    # name: (type, help, label names, histogram buckets)
+    DEFINITIONS = {
+        "llm_request_seconds": ("histogram", "Claude request duration by prompt stage", ["stage"], LONG_BUCKETS),
+        "llm_first_token_seconds": ("histogram", "Time to the first token of Claude replies", ["stage"], LONG_BUCKETS),
+        "llm_tokens": ("counter", "Claude tokens by prompt stage and kind", ["stage", "kind"], None),
+        "rate_limiter_wait_seconds": ("histogram", "Time requests waited for a rate limiter slot", ["limiter"], LONG_BUCKETS),
+        "rate_limiter_retries": ("counter", "Retried provider requests", ["limiter"], None),
+        "rate_limiter_in_flight": ("gauge", "Provider requests holding a slot", ["limiter"], None),
+        "rate_limiter_waiting": ("gauge", "Provider requests waiting for a slot", ["limiter"], None),
+        "skyvern_request_seconds": ("histogram", "Skyvern API request duration", ["operation"], LONG_BUCKETS),
+        "skyvern_task_seconds": ("histogram", "Time from watching a Skyvern task to its final status", ["status", "source"], LONG_BUCKETS),
+        "skyvern_task_polls": ("histogram", "Status polls per finished Skyvern task", [], (0, 1, 2, 3, 5, 10, 20, 50, 100)),
+        "skyvern_poll_lag_seconds": ("histogram", "How late due status polls were sent", [], LAG_BUCKETS),
+        "skyvern_tasks_watched": ("gauge", "Skyvern tasks awaiting their final status", [], None),
+        "marqo_request_seconds": ("histogram", "Marqo request duration by index", ["index", "operation"], LONG_BUCKETS),
+        "flow_planning_seconds": ("histogram", "Flow planning duration", ["planner", "status"], LONG_BUCKETS),
+        "action_seconds": ("histogram", "Action run duration", ["status"], LONG_BUCKETS),
+        "actions_in_flight": ("gauge", "Actions being run", [], None),
+        "execution_seconds": ("histogram", "Flow execution duration", ["status"], LONG_BUCKETS),
+        "executions_in_flight": ("gauge", "Flow executions being run", [], None),
+        "execution_queue_depth": ("gauge", "Executions waiting for a queue worker", [], None),
+        "event_loop_lag_seconds": ("histogram", "Event loop scheduling delay", [], LAG_BUCKETS),
+    }
+
+    def __init__(self, namespace: str = "automation"):
+        self.namespace = namespace
+        self.enabled = False
+        self.registry = None
+        self.tracer = None
+        self._tracer_provider = None
+        self._metrics: Dict[str, object] = {}
+        self._noop = nullcontext()
+
+    @property
+    def active(self) -> bool:
+        return self.enabled or self.tracer is not None
+
+    def enable(self, prometheus: bool = True, tracing: bool = False,
+               service_name: str = "automation") -> None:
+        """Start recording; needs prometheus_client, and the OpenTelemetry SDK
+        and OTLP exporter for ``tracing`` (configured by the standard
+        OTEL_EXPORTER_OTLP_* environment variables)."""
+        if prometheus:
+            try:
+                from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram,
+                                               ProcessCollector)
+            except ImportError as e:
+                raise RuntimeError("Metrics need the optional prometheus_client package") from e
+            self.registry = CollectorRegistry()
+            ProcessCollector(registry=self.registry)
+            types = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+            for name, (kind, documentation, labels, buckets) in self.DEFINITIONS.items():
+                options = {"buckets": buckets} if buckets else {}
+                self._metrics[name] = types[kind](
+                    name, documentation, labels, namespace=self.namespace,
+                    registry=self.registry, **options)
+            self.enabled = True
+
+        if tracing:
+            try:
+                from opentelemetry import trace
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            except ImportError as e:
+                raise RuntimeError("Tracing needs the optional opentelemetry-sdk and "
+                                   "opentelemetry-exporter-otlp-proto-http packages") from e
+            self._tracer_provider = TracerProvider(
+                resource=Resource.create({"service.name": service_name}))
+            self._tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            self.tracer = self._tracer_provider.get_tracer(self.namespace)
+
+    def _metric(self, name: str, labels: Dict):
+        metric = self._metrics[name]
+        return metric.labels(**labels) if labels else metric
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if self.enabled:
+            self._metric(name, labels).observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if self.enabled:
+            self._metric(name, labels).inc(value)
+
+    def add(self, name: str, value: float, **labels) -> None:
+        """Move a gauge by ``value``."""
+        if self.enabled:
+            self._metric(name, labels).inc(value)
+
+    def set(self, name: str, value: float, **labels) -> None:
+        if self.enabled:
+            self._metric(name, labels).set(value)
+
+    def span(self, name: str, **attributes):
+        """Context manager tracing a block as the current span, if tracing."""
+        if self.tracer is None:
+            return self._noop
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+    def timed(self, metric: str, span: Optional[str] = None, attributes: Optional[Dict] = None,
+              in_flight: Optional[str] = None, **labels):
+        """Context manager timing a block into the ``metric`` histogram.
+
+        Also traces the block as ``span`` and counts it in the ``in_flight``
+        gauge. A ``status`` label is switched to "failed" if the block raises.
+        """
+        if not self.active:
+            return self._noop
+        return self._timed(metric, span, attributes, in_flight, labels)
+
+    @contextmanager
+    def _timed(self, metric: str, span: Optional[str], attributes: Optional[Dict],
+               in_flight: Optional[str], labels: Dict):
+        with self.span(span, **labels, **(attributes or {})) if span else self._noop:
+            if in_flight:
+                self.add(in_flight, 1)
+            start = time.perf_counter()
+            try:
+                yield
+            except BaseException:
+                if "status" in labels:
+                    labels["status"] = "failed"
+                raise
+            finally:
+                self.observe(metric, time.perf_counter() - start, **labels)
+                if in_flight:
+                    self.add(in_flight, -1)
+
+    def render(self) -> Tuple[bytes, str]:
+        """Prometheus exposition of every metric and its content type."""
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+    async def monitor_event_loop(self, interval: float = 0.5) -> None:
+        """Record how late the event loop wakes up from ``interval`` long sleeps."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.observe("event_loop_lag_seconds", max(loop.time() - start - interval, 0))
+
+    def close(self) -> None:
+        if self._tracer_provider is not None:
+            # Flushes spans still waiting in the batch processor
+            self._tracer_provider.shutdown()
+
+
+# Process-wide metrics, enabled by the application at startup
+metrics = Metrics()
+
+
+class _TimedIndex:
+    """Marqo index whose requests are timed per index and operation."""
+
+    def __init__(self, index, name: str):
+        self._index = index
+        self._name = name
+
+    def __getattr__(self, operation: str):
+        method = getattr(self._index, operation)
+
+        def timed(*args, **kwargs):
+            with metrics.timed("marqo_request_seconds", f"marqo.{operation}",
+                               index=self._name, operation=operation):
+                return method(*args, **kwargs)
+
+        return timed
+
+
+class TTLCache:
+    """Small LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class MarqoDatabase:
-    def __init__(self, url: str = 'http://localhost:8882'):
+    # Largest result page Marqo returns for one search
+    MATCH_PAGE_SIZE = 1000
+
+    def __init__(self, url: str = 'http://localhost:8882', client_batch_size: Optional[int] = 32):
         self.client = marqo.Client(url=url)
+        # Documents per add_documents HTTP request when writing in bulk
+        self.client_batch_size = client_batch_size
         self.actions_index = "automation-actions"
         self.flows_index = "automation-flows"
         self.executions_index = "automation-executions"
+        self.execution_steps_index = "automation-execution-steps"
         self.blocks_index = "automation-blocks"
+        self.block_keys_index = "automation-block-keys"
+        self.llm_cache_index = "automation-llm-cache"
+        self.collections = {
+            "blocks": self.blocks_index,
+            "actions": self.actions_index,
+            "flows": self.flows_index,
+            "executions": self.executions_index
+        }
         # self.init_db()
 
+    def index(self, name: str):
+        index = self.client.index(name)
+        return _TimedIndex(index, name) if metrics.active else index
+
+    def _match_all(self, index_name: str, **options) -> Dict:
+        """Documents of an index matching only a filter, with no ranking query.
+
+        Lexical, because bookkeeping documents such as execution headers and
+        steps are stored without embeddings and tensor search never returns
+        them.
+        """
+        return self.index(index_name).search(q="*", search_method="LEXICAL", **options)
+
     def init_db(self):
         # Create indices if they don't exist
-        for index_name in [self.blocks_index, self.actions_index, self.flows_index, self.executions_index]:
+        for index_name in [self.blocks_index, self.block_keys_index, self.actions_index,
+                           self.flows_index, self.executions_index, self.execution_steps_index,
+                           self.llm_cache_index]:
             try:
                 self.client.create_index(index_name)
             except Exception:
                 # Index already exists
                 pass
 
-    async def store_block(self, block_data: Dict) -> str:
-        block_id = str(uuid.uuid4())
-        document = {
-            "_id": block_id,
+    def _block_document(self, block_data: Dict) -> Dict:
+        return {
+            "_id": block_data.get("id") or str(uuid.uuid4()),
             "name": block_data["name"],
             "type": block_data["type"],
             "url": block_data["url"],
+            "host": normalize_host(block_data["url"]),
+            "domain": registrable_domain(block_data["url"]),
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
 
-        self.client.index(self.blocks_index).add_documents(
-            [document], tensor_fields=["url"])
-        return block_id
+    async def store_block(self, block_data: Dict) -> str:
+        return (await self.store_blocks([block_data]))[0]
+
+    async def store_blocks(self, blocks: List[Dict]) -> List[str]:
+        documents = [self._block_document(block_data) for block_data in blocks]
+        if not documents:
+            return []
+
+        self.index(self.blocks_index).add_documents(
+            documents, tensor_fields=["url"], client_batch_size=self.client_batch_size)
+        self.index(self.block_keys_index).add_documents(
+            [self._block_key_document(document["_id"], document["url"]) for document in documents],
+            tensor_fields=[], client_batch_size=self.client_batch_size)
+        return [document["_id"] for document in documents]
+
+    def _block_key_document(self, block_id: str, url: str) -> Dict:
+        # Host -> block ID documents, looked up by ID without any inference
+        return {"_id": normalize_host(url), "block_id": block_id,
+                "domain": registrable_domain(url)}
+
+    async def index_block_keys(self, block_id: str, url: str) -> None:
+        self.index(self.block_keys_index).add_documents(
+            [self._block_key_document(block_id, url)], tensor_fields=[])
+
+    async def find_block_by_host(self, host: str) -> Optional[Dict]:
+        try:
+            mapping = self.index(self.block_keys_index).get_document(host)
+        except Exception:
+            return None
+        return await self.get_block(mapping["block_id"])
+
+    async def get_block(self, block_id: str) -> Optional[Dict]:
+        try:
+            return self.index(self.blocks_index).get_document(block_id)
+        except Exception:
+            return None
+
+    async def list_page(self, collection: str, limit: int = 100, cursor: Optional[str] = None,
+                        fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of a collection and the cursor of the next page.
+
+        Marqo only pages by offset (up to its maximum search offset), so the
+        cursor encodes an offset. With ``fields`` only those attributes are
+        retrieved, and executions only load their step records when
+        ``action_executions`` is among them.
+        """
+        if collection not in self.collections:
+            raise ValueError(f"Unknown collection: {collection}")
+        offset = decode_cursor(cursor) if cursor else 0
+        if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+            raise ValueError("Invalid cursor")
+        with_steps = collection == "executions" and (fields is None or "action_executions" in fields)
+
+        options = {}
+        if fields is not None:
+            attributes = [f for f in fields if f != "action_executions"]
+            if with_steps:
+                attributes.append("step_count")
+            options["attributes_to_retrieve"] = attributes
+        results = self._match_all(self.collections[collection], limit=limit,
+                                  offset=offset, **options)
+        hits = [_decode_document(collection, hit) for hit in results["hits"]]
+        next_cursor = encode_cursor(offset + len(hits)) if len(hits) == limit else None
+
+        if with_steps:
+            steps = await self.get_execution_steps(hits)
+            hits = [self._decode_execution(hit, steps[hit["_id"]]) for hit in hits]
+        return [_project(hit, fields) for hit in hits], next_cursor
+
+    async def list_blocks(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("blocks", limit))[0]
 
     async def search_blocks(self, url: str) -> List[Dict]:
-        results = self.client.index(self.blocks_index).search(
+        results = self.index(self.blocks_index).search(
             q=f'with {url}',
         )
         return [result for result in results["hits"]]
 
-    async def store_action(self, action_data: Dict) -> str:
-        action_id = str(uuid.uuid4())
-        document = {
-            "_id": action_id,
+    def _action_document(self, action_data: Dict) -> Dict:
+        return {
+            "_id": action_data.get("id") or str(uuid.uuid4()),
             "block_id": action_data["block_id"],
             "name": action_data["name"],
             "navigation_goal": action_data["navigation_goal"],
@@ -85,17 +503,28 @@ class MarqoDatabase:
             "required_inputs": json.dumps(action_data["required_inputs"]),
             "output_schema": json.dumps(action_data["output_schema"]),
             "url": action_data["url"],
+            "result_ttl": float(action_data.get("result_ttl") or 0),
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
 
-        self.client.index(self.actions_index).add_documents(
-            [document], tensor_fields=["url", "navigation_goal", "data_extraction_goal"])
-        return action_id
+    async def store_action(self, action_data: Dict) -> str:
+        return (await self.store_actions([action_data]))[0]
+
+    async def store_actions(self, actions: List[Dict]) -> List[str]:
+        """Store several actions with one batched add_documents call."""
+        documents = [self._action_document(action_data) for action_data in actions]
+        if not documents:
+            return []
+
+        self.index(self.actions_index).add_documents(
+            documents, tensor_fields=["url", "navigation_goal", "data_extraction_goal"],
+            client_batch_size=self.client_batch_size)
+        return [document["_id"] for document in documents]
 
     async def get_action(self, action_id: str) -> Optional[Dict]:
         try:
-            result = self.client.index(
+            result = self.index(
                 self.actions_index).get_document(action_id)
             if result:
                 return {
@@ -106,8 +535,30 @@ class MarqoDatabase:
         except Exception:
             return None
 
+    async def get_actions(self, action_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch several actions with one multi-document request."""
+        if not action_ids:
+            return {}
+        results = self.index(self.actions_index).get_documents(
+            document_ids=list(dict.fromkeys(action_ids)))
+        return {
+            result["_id"]: {
+                **result,
+                "required_inputs": json.loads(result["required_inputs"]),
+                "output_schema": json.loads(result["output_schema"])
+            }
+            for result in results["results"] if result.get("_found", True)
+        }
+
+    async def update_action(self, action_id: str, fields: Dict) -> None:
+        self.index(self.actions_index).update_documents(
+            [{"_id": action_id, **fields, "updated_at": datetime.now().isoformat()}])
+
+    async def list_actions(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("actions", limit))[0]
+
     async def store_flow(self, flow_data: Dict) -> str:
-        flow_id = str(uuid.uuid4())
+        flow_id = flow_data.get("id") or str(uuid.uuid4())
         document = {
             "_id": flow_id,
             "name": flow_data["name"],
@@ -117,28 +568,160 @@ class MarqoDatabase:
             "updated_at": datetime.now().isoformat()
         }
 
-        self.client.index(self.flows_index).add_documents(
+        self.index(self.flows_index).add_documents(
             [document], tensor_fields=["name", "description"])
         return flow_id
 
+    async def get_flow(self, flow_id: str) -> Optional[Dict]:
+        try:
+            result = self.index(self.flows_index).get_document(flow_id)
+        except Exception:
+            return None
+        if not result:
+            return None
+        return {**result, "actions": json.loads(result["actions"])}
+
+    async def list_flows(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("flows", limit))[0]
+
+    async def update_flow(self, flow_id: str, fields: Dict) -> None:
+        self.index(self.flows_index).update_documents(
+            [{"_id": flow_id, **fields}])
+
+    async def search_flows_by_status(self, status: str, limit: int = 100) -> List[Dict]:
+        results = self.index(self.flows_index).search(
+            q=status,
+            filter_string=f"status:{status}",
+            limit=limit
+        )
+        return [{**hit, "actions": json.loads(hit["actions"])} for hit in results["hits"]]
+
     async def store_execution(self, execution_data: Dict) -> str:
-        execution_id = str(uuid.uuid4())
+        """Create (or reset) the header record of a flow execution.
+
+        Per-action progress is not part of this document; it is written as
+        separate step records via ``store_execution_step``.
+        """
+        execution_id = execution_data.get("id") or str(uuid.uuid4())
         document = {
             "_id": execution_id,
-            "flow_id": execution_data.get("flow_id", ""),
+            "flow_id": execution_data.get("flow_id") or "",
+            "prompt": execution_data.get("prompt") or "",
+            "error": execution_data.get("error") or "",
             "initial_inputs": json.dumps(execution_data.get("initial_inputs", {})),
-            "action_executions": json.dumps(execution_data.get("action_executions", [])),
             "status": execution_data.get("status", ""),
-            "started_at": execution_data.get("started_at", datetime.now().isoformat()),
-            "completed_at": execution_data.get("completed_at", "")
+            "step_count": execution_data.get("step_count", 0),
+            "started_at": execution_data.get("started_at") or datetime.now().isoformat(),
+            "completed_at": execution_data.get("completed_at") or ""
         }
 
-        self.client.index(self.executions_index).add_documents(
-            [document], tensor_fields=["flow_id", "initial_inputs"])
+        # Bookkeeping only, nothing here needs to be searchable by meaning
+        self.index(self.executions_index).add_documents(
+            [document], tensor_fields=[])
         return execution_id
 
+    async def update_execution(self, execution_id: str, fields: Dict) -> None:
+        self.index(self.executions_index).update_documents(
+            [{"_id": execution_id, **fields}])
+
+    async def store_execution_step(self, execution_id: str, step: Dict) -> None:
+        """Write the record of one action execution within a flow execution."""
+        document = {
+            "_id": f"{execution_id}:{step['step']}",
+            "execution_id": execution_id,
+            "step": step["step"],
+            "action_execution_id": step["id"],
+            "action_id": step["action_id"],
+            "status": step["status"],
+            "skyvern_task_id": step.get("skyvern_task_id") or "",
+            "inputs": json.dumps(step.get("inputs") or {}),
+            "output": json.dumps(step.get("output")),
+            "error": step.get("error") or "",
+            "started_at": step.get("started_at") or "",
+            "completed_at": step.get("completed_at") or "",
+            "cache_hit": bool(step.get("cache_hit")),
+            "node_key": step.get("node_key") or ""
+        }
+        self.index(self.execution_steps_index).add_documents(
+            [document], tensor_fields=[])
+
+    async def get_execution_steps(self, executions: List[Dict]) -> Dict[str, List[Dict]]:
+        """Fetch the step records of several executions in one request."""
+        step_ids = [f"{execution['_id']}:{step}"
+                    for execution in executions
+                    for step in range(int(execution.get("step_count") or 0))]
+        steps: Dict[str, List[Dict]] = {execution["_id"]: [] for execution in executions}
+        if not step_ids:
+            return steps
+
+        results = self.index(self.execution_steps_index).get_documents(
+            document_ids=step_ids)
+        for document in results["results"]:
+            if document.get("_found", True) and "execution_id" in document:
+                steps[document["execution_id"]].append(_decode_step(document))
+        for execution_steps in steps.values():
+            execution_steps.sort(key=lambda step: step["step"])
+        return steps
+
+    def _decode_execution(self, document: Dict, steps: List[Dict]) -> Dict:
+        execution = _decode_document("executions", document)
+        if isinstance(document.get("action_executions"), str):
+            # Records written before step documents existed
+            execution["action_executions"] = json.loads(document["action_executions"])
+        else:
+            execution["action_executions"] = steps
+        return execution
+
+    async def get_execution(self, execution_id: str) -> Optional[Dict]:
+        try:
+            document = self.index(self.executions_index).get_document(execution_id)
+        except Exception:
+            return None
+        if not document:
+            return None
+        steps = await self.get_execution_steps([document])
+        return self._decode_execution(document, steps[execution_id])
+
+    async def list_executions(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("executions", limit))[0]
+
+    async def search_executions_by_status(self, status: str, limit: int = 100) -> List[Dict]:
+        results = self._match_all(self.executions_index,
+                                  filter_string=f"status:{status}", limit=limit)
+        return [result for result in results["hits"]]
+
+    async def search_executions_by_flow(self, flow_id: str, limit: int = 100) -> List[Dict]:
+        """Execution headers of a flow, most recently started first.
+
+        Lexical hits come unranked, so every header of the flow is read (in
+        pages, up to Marqo's maximum search offset) before the newest are
+        picked.
+        """
+        hits = []
+        while True:
+            page = self._match_all(self.executions_index, filter_string=f"flow_id:{flow_id}",
+                                   limit=self.MATCH_PAGE_SIZE, offset=len(hits))["hits"]
+            hits.extend(page)
+            if len(page) < self.MATCH_PAGE_SIZE:
+                break
+        hits.sort(key=lambda hit: hit.get("started_at") or "", reverse=True)
+        return hits[:limit]
+
+    async def store_llm_response(self, entry: Dict) -> None:
+        # Only the request text is embedded, the response is stored verbatim
+        self.index(self.llm_cache_index).add_documents(
+            [entry], tensor_fields=["request"])
+
+    async def search_llm_responses(self, request: str, stage: str) -> List[Dict]:
+        results = self.index(self.llm_cache_index).search(
+            q=request,
+            filter_string=f"stage:{stage}",
+            limit=1
+        )
+        return [result for result in results["hits"]]
+
     async def search_actions(self, query: str) -> List[Dict]:
-        results = self.client.index(self.actions_index).search(
+        results = self.index(self.actions_index).search(
             q=query,
             # searchable_attributes=[
             #     "name", "navigation_goal", "data_extraction_goal"]
@@ -146,6 +729,442 @@ class MarqoDatabase:
         return [result for result in results["hits"]]
 
 
+class SQLiteDatabase:
+    """SQLite storage backend with the same interface as MarqoDatabase.
+
+    Blocks, actions, flows and executions are kept in SQLite (WAL mode,
+    pooled connections, queries run off the event loop). When a
+    MarqoDatabase is passed as ``semantic``, blocks and actions are also
+    indexed there and Marqo only answers the semantic searches.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS blocks (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            url TEXT NOT NULL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS actions (
+            id TEXT PRIMARY KEY,
+            block_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            navigation_goal TEXT NOT NULL,
+            data_extraction_goal TEXT NOT NULL,
+            required_inputs TEXT NOT NULL,
+            output_schema TEXT NOT NULL,
+            url TEXT NOT NULL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            FOREIGN KEY (block_id) REFERENCES blocks(id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS flows (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            actions TEXT NOT NULL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS executions (
+            id TEXT PRIMARY KEY,
+            flow_id TEXT NOT NULL,
+            initial_inputs TEXT,
+            action_executions TEXT,
+            status TEXT NOT NULL,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS execution_steps (
+            execution_id TEXT NOT NULL,
+            step INTEGER NOT NULL,
+            action_execution_id TEXT NOT NULL,
+            action_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            skyvern_task_id TEXT,
+            inputs TEXT,
+            output TEXT,
+            error TEXT,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            PRIMARY KEY (execution_id, step)
+        )"""
+    ]
+
+    # Columns added after the original automation.db schema
+    EXTRA_COLUMNS = {
+        "blocks": {"host": "TEXT", "domain": "TEXT"},
+        "flows": {"status": "TEXT", "missing_inputs": "TEXT"},
+        "actions": {"result_ttl": "REAL NOT NULL DEFAULT 0"},
+        "executions": {"prompt": "TEXT", "error": "TEXT",
+                       "step_count": "INTEGER NOT NULL DEFAULT 0"},
+        "execution_steps": {"cache_hit": "INTEGER NOT NULL DEFAULT 0", "node_key": "TEXT"}
+    }
+
+    INDEXES = [
+        "CREATE INDEX IF NOT EXISTS idx_blocks_url ON blocks(url)",
+        "CREATE INDEX IF NOT EXISTS idx_blocks_host ON blocks(host)",
+        "CREATE INDEX IF NOT EXISTS idx_blocks_domain ON blocks(domain)",
+        "CREATE INDEX IF NOT EXISTS idx_actions_block_id ON actions(block_id)",
+        "CREATE INDEX IF NOT EXISTS idx_flows_status ON flows(status)",
+        "CREATE INDEX IF NOT EXISTS idx_executions_status ON executions(status)",
+        "CREATE INDEX IF NOT EXISTS idx_executions_flow_id ON executions(flow_id)",
+        "CREATE INDEX IF NOT EXISTS idx_executions_started_at ON executions(started_at)",
+        "CREATE INDEX IF NOT EXISTS idx_blocks_created_at ON blocks(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_actions_created_at ON actions(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_flows_created_at ON flows(created_at)"
+    ]
+
+    # Keyset pagination order of each listable table
+    ORDER_COLUMNS = {
+        "blocks": "created_at",
+        "actions": "created_at",
+        "flows": "created_at",
+        "executions": "started_at"
+    }
+
+    def __init__(self, path: str = "automation.db",
+                 semantic: Optional[MarqoDatabase] = None, pool_size: int = 4):
+        self.path = path
+        self.semantic = semantic
+        self._columns: Dict[str, Set[str]] = {}
+        self._pool: queue.Queue = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        self.init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+
+    def init_db(self):
+        with self.connection() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            for table, columns in self.EXTRA_COLUMNS.items():
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column, declaration in columns.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+            for statement in self.INDEXES:
+                conn.execute(statement)
+            # Backfill lookup keys of blocks created before they existed
+            for row in conn.execute("SELECT id, url FROM blocks WHERE host IS NULL").fetchall():
+                conn.execute("UPDATE blocks SET host = ?, domain = ? WHERE id = ?",
+                             (normalize_host(row["url"]), registrable_domain(row["url"]), row["id"]))
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        # Same "_id" convention as Marqo documents
+        return [{"_id": row["id"], **{k: row[k] for k in row.keys() if k != "id"}}
+                if "id" in row.keys() else dict(row) for row in rows]
+
+    def _write(self, sql: str, params: tuple = ()) -> None:
+        with self.connection() as conn:
+            conn.execute(sql, params)
+
+    def _write_many(self, sql: str, rows: List[tuple]) -> None:
+        with self.connection() as conn:
+            conn.executemany(sql, rows)
+
+    async def _fetch(self, sql: str, params: tuple = ()) -> List[Dict]:
+        return await asyncio.to_thread(self._query, sql, tuple(_plain(p) for p in params))
+
+    async def _execute(self, sql: str, params: tuple = ()) -> None:
+        await asyncio.to_thread(self._write, sql, tuple(_plain(p) for p in params))
+
+    async def _execute_many(self, sql: str, rows: List[tuple]) -> None:
+        if rows:
+            await asyncio.to_thread(self._write_many, sql,
+                                    [tuple(_plain(p) for p in row) for row in rows])
+
+    async def _table_columns(self, table: str) -> Set[str]:
+        if table not in self._columns:
+            rows = await self._fetch(f"PRAGMA table_info({table})")
+            self._columns[table] = {row["name"] for row in rows}
+        return self._columns[table]
+
+    async def _update(self, table: str, row_id: str, fields: Dict) -> None:
+        columns = await self._table_columns(table)
+        unknown = set(fields) - set(columns)
+        if unknown:
+            raise ValueError(f"Unknown {table} columns: {sorted(unknown)}")
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        await self._execute(f"UPDATE {table} SET {assignments} WHERE id = ?",
+                            (*fields.values(), row_id))
+
+    async def store_block(self, block_data: Dict) -> str:
+        return (await self.store_blocks([block_data]))[0]
+
+    async def store_blocks(self, blocks: List[Dict]) -> List[str]:
+        now = datetime.now().isoformat()
+        blocks = [{**block_data, "id": block_data.get("id") or str(uuid.uuid4())}
+                  for block_data in blocks]
+        await self._execute_many(
+            "INSERT INTO blocks (id, name, type, url, host, domain, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(block_data["id"], block_data["name"], block_data["type"], block_data["url"],
+              normalize_host(block_data["url"]), registrable_domain(block_data["url"]), now, now)
+             for block_data in blocks])
+        if self.semantic:
+            await self.semantic.store_blocks(blocks)
+        return [block_data["id"] for block_data in blocks]
+
+    async def get_block(self, block_id: str) -> Optional[Dict]:
+        rows = await self._fetch("SELECT * FROM blocks WHERE id = ?", (block_id,))
+        return rows[0] if rows else None
+
+    async def list_page(self, collection: str, limit: int = 100, cursor: Optional[str] = None,
+                        fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of a table and the cursor of the next page.
+
+        Pages are keyset-paginated on (order column, id), newest first, so
+        deep pages cost the same as the first one.
+        """
+        if collection not in self.ORDER_COLUMNS:
+            raise ValueError(f"Unknown collection: {collection}")
+        order = self.ORDER_COLUMNS[collection]
+        with_steps = collection == "executions" and (fields is None or "action_executions" in fields)
+
+        select = "*"
+        if fields is not None:
+            wanted = [f for f in fields if f not in ("_id", "action_executions")]
+            unknown = set(wanted) - await self._table_columns(collection)
+            if unknown:
+                raise ValueError(f"Unknown {collection} fields: {sorted(unknown)}")
+            columns = ["id", order, *wanted] + (["step_count"] if with_steps else [])
+            select = ", ".join(dict.fromkeys(columns))
+
+        where = ""
+        params: tuple = ()
+        if cursor:
+            position = decode_cursor(cursor)
+            if not isinstance(position, list) or len(position) != 2 or \
+                    not isinstance(position[1], str) or isinstance(position[0], bool) or \
+                    not isinstance(position[0], (str, int, float)):
+                raise ValueError("Invalid cursor")
+            last_value, last_id = position
+            where = f"WHERE {order} < ? OR ({order} = ? AND id < ?)"
+            params = (last_value, last_value, last_id)
+        rows = await self._fetch(
+            f"SELECT {select} FROM {collection} {where} ORDER BY {order} DESC, id DESC LIMIT ?",
+            (*params, limit + 1))
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][order], rows[-1]["_id"]])
+
+        if with_steps:
+            steps = await self.get_execution_steps(rows)
+            rows = [self._decode_execution(row, steps[row["_id"]]) for row in rows]
+        else:
+            rows = [_decode_document(collection, row) for row in rows]
+        return [_project(row, fields) for row in rows], next_cursor
+
+    async def list_blocks(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("blocks", limit))[0]
+
+    async def index_block_keys(self, block_id: str, url: str) -> None:
+        await self._execute("UPDATE blocks SET host = ?, domain = ? WHERE id = ?",
+                            (normalize_host(url), registrable_domain(url), block_id))
+
+    async def find_block_by_host(self, host: str) -> Optional[Dict]:
+        rows = await self._fetch(
+            "SELECT * FROM blocks WHERE host = ? ORDER BY created_at DESC LIMIT 1", (host,))
+        return rows[0] if rows else None
+
+    async def search_blocks(self, url: str) -> List[Dict]:
+        if self.semantic:
+            return await self.semantic.search_blocks(url)
+        return await self._fetch(
+            "SELECT * FROM blocks WHERE url LIKE ? LIMIT 10", (f"%{url}%",))
+
+    async def store_action(self, action_data: Dict) -> str:
+        return (await self.store_actions([action_data]))[0]
+
+    async def store_actions(self, actions: List[Dict]) -> List[str]:
+        now = datetime.now().isoformat()
+        actions = [{**action_data, "id": action_data.get("id") or str(uuid.uuid4())}
+                   for action_data in actions]
+        await self._execute_many(
+            "INSERT INTO actions (id, block_id, name, navigation_goal, data_extraction_goal, "
+            "required_inputs, output_schema, url, result_ttl, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(action_data["id"], action_data["block_id"], action_data["name"],
+              action_data["navigation_goal"], action_data["data_extraction_goal"],
+              json.dumps(action_data["required_inputs"]),
+              json.dumps(action_data["output_schema"]),
+              action_data["url"], float(action_data.get("result_ttl") or 0), now, now)
+             for action_data in actions])
+        if self.semantic:
+            await self.semantic.store_actions(actions)
+        return [action_data["id"] for action_data in actions]
+
+    async def get_action(self, action_id: str) -> Optional[Dict]:
+        return (await self.get_actions([action_id])).get(action_id)
+
+    async def get_actions(self, action_ids: List[str]) -> Dict[str, Dict]:
+        action_ids = list(dict.fromkeys(action_ids))
+        if not action_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in action_ids)
+        rows = await self._fetch(
+            f"SELECT * FROM actions WHERE id IN ({placeholders})", tuple(action_ids))
+        return {
+            row["_id"]: {
+                **row,
+                "required_inputs": json.loads(row["required_inputs"]),
+                "output_schema": json.loads(row["output_schema"])
+            }
+            for row in rows
+        }
+
+    async def update_action(self, action_id: str, fields: Dict) -> None:
+        await self._update("actions", action_id,
+                           {**fields, "updated_at": datetime.now().isoformat()})
+
+    async def list_actions(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("actions", limit))[0]
+
+    async def search_actions(self, query: str) -> List[Dict]:
+        if self.semantic:
+            return await self.semantic.search_actions(query)
+        # Without Marqo, rank by how many query words each action mentions
+        words = [word.lower() for word in query.split() if len(word) > 2]
+        actions = await self._fetch("SELECT * FROM actions")
+        scored = []
+        for action in actions:
+            text = " ".join([action["name"], action["navigation_goal"],
+                             action["data_extraction_goal"]]).lower()
+            score = sum(word in text for word in words)
+            if score:
+                scored.append((score, action))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [action for _, action in scored[:10]]
+
+    async def store_flow(self, flow_data: Dict) -> str:
+        flow_id = flow_data.get("id") or str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        await self._execute(
+            "INSERT INTO flows (id, name, description, actions, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (flow_id, flow_data["name"], flow_data["description"],
+             json.dumps(flow_data["actions"]), now, now))
+        return flow_id
+
+    async def get_flow(self, flow_id: str) -> Optional[Dict]:
+        rows = await self._fetch("SELECT * FROM flows WHERE id = ?", (flow_id,))
+        if not rows:
+            return None
+        return {**rows[0], "actions": json.loads(rows[0]["actions"])}
+
+    async def list_flows(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("flows", limit))[0]
+
+    async def update_flow(self, flow_id: str, fields: Dict) -> None:
+        await self._update("flows", flow_id,
+                           {**fields, "updated_at": datetime.now().isoformat()})
+
+    async def search_flows_by_status(self, status: str, limit: int = 100) -> List[Dict]:
+        rows = await self._fetch(
+            "SELECT * FROM flows WHERE status = ? LIMIT ?", (status, limit))
+        return [{**row, "actions": json.loads(row["actions"])} for row in rows]
+
+    async def store_execution(self, execution_data: Dict) -> str:
+        execution_id = execution_data.get("id") or str(uuid.uuid4())
+        await self._execute(
+            "INSERT OR REPLACE INTO executions (id, flow_id, prompt, error, initial_inputs, "
+            "status, step_count, started_at, completed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (execution_id,
+             execution_data.get("flow_id") or "",
+             execution_data.get("prompt") or "",
+             execution_data.get("error") or "",
+             json.dumps(execution_data.get("initial_inputs", {})),
+             execution_data.get("status", ""),
+             execution_data.get("step_count", 0),
+             execution_data.get("started_at") or datetime.now().isoformat(),
+             execution_data.get("completed_at") or ""))
+        return execution_id
+
+    async def update_execution(self, execution_id: str, fields: Dict) -> None:
+        await self._update("executions", execution_id, fields)
+
+    async def store_execution_step(self, execution_id: str, step: Dict) -> None:
+        await self._execute(
+            "INSERT OR REPLACE INTO execution_steps (execution_id, step, action_execution_id, "
+            "action_id, status, skyvern_task_id, inputs, output, error, started_at, completed_at, "
+            "cache_hit, node_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (execution_id, step["step"], step["id"], step["action_id"], step["status"],
+             step.get("skyvern_task_id") or "",
+             json.dumps(step.get("inputs") or {}),
+             json.dumps(step.get("output")),
+             step.get("error") or "",
+             step.get("started_at") or "",
+             step.get("completed_at") or "",
+             int(bool(step.get("cache_hit"))),
+             step.get("node_key")))
+
+    async def get_execution_steps(self, executions: List[Dict]) -> Dict[str, List[Dict]]:
+        steps: Dict[str, List[Dict]] = {execution["_id"]: [] for execution in executions}
+        if not steps:
+            return steps
+        placeholders = ", ".join("?" for _ in steps)
+        rows = await self._fetch(
+            f"SELECT * FROM execution_steps WHERE execution_id IN ({placeholders}) "
+            "ORDER BY execution_id, step", tuple(steps))
+        for row in rows:
+            steps[row["execution_id"]].append(_decode_step(row))
+        return steps
+
+    def _decode_execution(self, row: Dict, steps: List[Dict]) -> Dict:
+        execution = _decode_document("executions", row)
+        if row.get("action_executions"):
+            # Rows written before step records existed
+            execution["action_executions"] = json.loads(row["action_executions"])
+        else:
+            execution.pop("action_executions", None)
+            execution["action_executions"] = steps
+        return execution
+
+    async def get_execution(self, execution_id: str) -> Optional[Dict]:
+        rows = await self._fetch("SELECT * FROM executions WHERE id = ?", (execution_id,))
+        if not rows:
+            return None
+        steps = await self.get_execution_steps(rows)
+        return self._decode_execution(rows[0], steps[execution_id])
+
+    async def list_executions(self, limit: int = 100) -> List[Dict]:
+        return (await self.list_page("executions", limit))[0]
+
+    async def search_executions_by_status(self, status: str, limit: int = 100) -> List[Dict]:
+        return await self._fetch(
+            "SELECT * FROM executions WHERE status = ? LIMIT ?", (status, limit))
+
+    async def search_executions_by_flow(self, flow_id: str, limit: int = 100) -> List[Dict]:
+        return await self._fetch(
+            "SELECT * FROM executions WHERE flow_id = ? ORDER BY started_at DESC LIMIT ?",
+            (flow_id, limit))
+
+
 class FlowExecution:
     def __init__(self, id: str, flow_id: str, initial_inputs: Dict, action_executions: List):
         self.id = id
@@ -162,67 +1181,594 @@ class FlowExecution:
         }
 
 
+class LLMResponseCache:
+    """Cache of Claude responses for repeated planning/analysis prompts.
+
+    The exact tier is keyed by a hash of model, token limit and prompt. The
+    optional semantic tier stores responses in Marqo keyed by the user's
+    request text, so near-identical requests ("cheapest flight to NYC" vs
+    "cheapest flights to NYC") reuse a plan when their similarity score is
+    at least ``similarity_threshold``. Semantic entries only expire by TTL.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 86400,
+                 semantic_db: Optional[MarqoDatabase] = None,
+                 similarity_threshold: float = 0.97):
+        self.exact = TTLCache(max_size=max_size, ttl=ttl)
+        self.ttl = ttl
+        self.semantic_db = semantic_db
+        self.similarity_threshold = similarity_threshold
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, max_tokens: int, prompt: str, system: Optional[str] = None) -> str:
+        return hashlib.sha256(
+            f"{model}\n{max_tokens}\n{system or ''}\n{prompt}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str, stage: str, semantic_key: Optional[str] = None) -> Optional[str]:
+        response = self.exact.get(key)
+        if response is not None:
+            self.hits["exact"] += 1
+            return response
+
+        if self.semantic_db and semantic_key:
+            try:
+                hits = await self.semantic_db.search_llm_responses(semantic_key, stage)
+            except Exception:
+                hits = []
+            for hit in hits:
+                if hit.get("_score", 0) >= self.similarity_threshold and \
+                        hit.get("expires_at", 0) > time.time():
+                    self.hits["semantic"] += 1
+                    self.exact.set(key, hit["response"])
+                    return hit["response"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, stage: str, response: str,
+                  semantic_key: Optional[str] = None) -> None:
+        self.exact.set(key, response)
+        if self.semantic_db and semantic_key:
+            try:
+                await self.semantic_db.store_llm_response({
+                    "_id": key,
+                    "stage": stage,
+                    "request": semantic_key,
+                    "response": response,
+                    "expires_at": time.time() + self.ttl
+                })
+            except Exception:
+                # The semantic tier is best effort
+                pass
+
+    def stats(self) -> Dict:
+        lookups = sum(self.hits.values()) + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": sum(self.hits.values()) / lookups if lookups else 0.0,
+            "size": len(self.exact)
+        }
+
+
+class ActionResultCache:
+    """Reuse of Skyvern results for repeated runs of the same action.
+
+    Results are keyed by action ID plus the canonical JSON of the task
+    inputs and kept for the action's ``result_ttl`` seconds, or
+    ``default_ttl`` for actions without one; a TTL of 0 disables caching for
+    that action. Identical runs that start while one is in flight share its
+    Skyvern task instead of starting their own.
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: float = 0):
+        self.results = TTLCache(max_size=max_size)
+        self.default_ttl = default_ttl
+        # In-flight task runs by key, shared by identical requests
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._started: Dict[str, asyncio.Future] = {}
+        self.hits = {"cached": 0, "coalesced": 0}
+        self.misses = 0
+
+    @staticmethod
+    def key(action_id: str, inputs: Dict) -> str:
+        canonical = json.dumps(inputs or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{action_id}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+    def ttl_for(self, action: Dict) -> float:
+        return float(action.get("result_ttl") or self.default_ttl or 0)
+
+    async def run(self, action_id: str, inputs: Dict, ttl: float,
+                  execute: Callable[[Callable[[Any], Awaitable[None]]], Awaitable[Dict]],
+                  on_started: Optional[Callable[[Any], Awaitable[None]]] = None
+                  ) -> Tuple[Dict, bool]:
+        """Return ``(result, reused)``, calling ``execute`` only on a miss.
+
+        ``execute`` is shared by every caller of the same key, so it gets a
+        ``started`` callback instead of touching caller state; each caller's
+        own ``on_started`` is called with the value passed to it, in the
+        caller's task.
+        """
+        key = self.key(action_id, inputs)
+        result = self.results.get(key)
+        if result is not None:
+            self.hits["cached"] += 1
+            return result, True
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.hits["coalesced"] += 1
+            return await self._join(task, self._started[key], on_started), True
+
+        self.misses += 1
+        started = asyncio.get_running_loop().create_future()
+
+        async def mark_started(value: Any) -> None:
+            if not started.done():
+                started.set_result(value)
+
+        task = asyncio.create_task(execute(mark_started))
+        self._in_flight[key] = task
+        self._started[key] = started
+
+        def finished(task: asyncio.Task) -> None:
+            self._in_flight.pop(key, None)
+            self._started.pop(key, None)
+            # Failed runs are not cached, the next request retries
+            if not task.cancelled() and task.exception() is None:
+                self.results.set(key, task.result(), ttl=ttl)
+
+        task.add_done_callback(finished)
+        return await self._join(task, started, on_started), False
+
+    @staticmethod
+    async def _join(task: asyncio.Task, started: asyncio.Future,
+                    on_started: Optional[Callable[[Any], Awaitable[None]]]) -> Dict:
+        # Neither wait() nor shield() cancels the shared task with the caller
+        if on_started is not None:
+            await asyncio.wait({task, started}, return_when=asyncio.FIRST_COMPLETED)
+            if started.done():
+                await on_started(started.result())
+        return await asyncio.shield(task)
+
+    def invalidate_action(self, action_id: str) -> None:
+        for key in self.results.keys():
+            if key.startswith(f"{action_id}:"):
+                self.results.pop(key)
+
+    def stats(self) -> Dict:
+        lookups = sum(self.hits.values()) + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": sum(self.hits.values()) / lookups if lookups else 0.0,
+            "size": len(self.results),
+            "in_flight": len(self._in_flight)
+        }
+
+
+class Priority(int, Enum):
+    """Admission lanes of a RateLimiter, lower values go first."""
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+# Lane of the provider calls made by the current task; background execution
+# workers switch to BATCH so API requests from users are admitted first
+request_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "request_priority", default=Priority.INTERACTIVE)
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait before retrying ``error``.
+
+    Returns 0 for retryable errors without a Retry-After header and None
+    for errors that should not be retried at all.
+    """
+    if isinstance(error, (httpx.TransportError, anthropic.APIConnectionError,
+                          asyncio.TimeoutError)):
+        return 0.0
+    response = getattr(error, "response", None)
+    if not isinstance(response, httpx.Response) or \
+            response.status_code not in RETRYABLE_STATUS_CODES:
+        return None
+    header = response.headers.get("retry-after")
+    if not header:
+        return 0.0
+    try:
+        return max(float(header), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(header).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RateLimiter:
+    """Token bucket plus concurrency cap in front of one provider's API.
+
+    Requests are admitted while fewer than ``max_concurrency`` are in flight
+    and the bucket (refilled at ``rate`` per second up to ``burst``) has a
+    token; ``rate=None`` disables the bucket. Waiting requests are admitted
+    by priority lane, then in arrival order. ``call`` retries throttled and
+    transient failures with jittered exponential backoff, and a Retry-After
+    from the provider pauses every lane, not just the failing request.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 8, rate: Optional[float] = None,
+                 burst: Optional[int] = None, max_retries: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 30.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst or max(int(rate or 1), 1)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._waiters: List[tuple] = []
+        self._sequence = count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats_counts = {"admitted": 0, "retries": 0, "throttled": 0}
+
+    def _refill(self, now: float) -> None:
+        if self.rate is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._waiters and self._active < self.max_concurrency:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            if now < self._paused_until:
+                self._schedule(self._paused_until - now)
+                return
+            self._refill(now)
+            if self.rate is not None:
+                if self._tokens < 1:
+                    self._schedule((1 - self._tokens) / self.rate)
+                    return
+                self._tokens -= 1
+            _, _, future = heapq.heappop(self._waiters)
+            self._active += 1
+            self.stats_counts["admitted"] += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: Optional[Priority] = None) -> None:
+        priority = request_priority.get() if priority is None else priority
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._dispatch()
+        start = time.perf_counter()
+        try:
+            await future
+            metrics.observe("rate_limiter_wait_seconds", time.perf_counter() - start,
+                            limiter=self.name)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before the cancellation arrived
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def backoff(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Delay before retry ``attempt`` of ``error``, None to give up."""
+        if attempt >= self.max_retries:
+            return None
+        wait = retry_after(error)
+        if wait is None:
+            return None
+        if wait:
+            self.stats_counts["throttled"] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + wait)
+        # Full jitter, but never earlier than the provider asked for
+        return max(wait, random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    async def call(self, request: Callable[[], Awaitable], priority: Optional[Priority] = None,
+                   retryable: Optional[Callable[[BaseException], bool]] = None):
+        """Run ``request()`` in a slot, retrying throttled/transient failures.
+
+        ``retryable`` narrows which failures are retried, e.g. for requests
+        that are not safe to send twice.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(priority):
+                    return await request()
+            except Exception as e:
+                delay = self.backoff(e, attempt) if retryable is None or retryable(e) else None
+                if delay is None:
+                    raise
+            attempt += 1
+            self.stats_counts["retries"] += 1
+            metrics.inc("rate_limiter_retries", limiter=self.name)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self._active,
+            "waiting": sum(1 for *_, future in self._waiters if not future.done()),
+            "tokens": None if self.rate is None else round(self._tokens, 2),
+            **self.stats_counts
+        }
+
+
 class LLMService:
     """Service for interacting with Claude."""
 
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
-        
-    async def createAppJsx(self, prompt: str, unstructured_data: str) -> str:
-        prompt = f"""
-        This was the original prompt: {prompt}, use information from that to structure the data
-        Given this unstructured data: {unstructured_data}
-        Create a modern React App.jsx component that displays this data in a clean, organized way.
+    def __init__(self, api_key: str, model: str = "claude-3-5-sonnet-20241022",
+                 max_concurrency: int = 8, timeout: float = 120.0,
+                 max_retries: int = 2, cache: Optional[LLMResponseCache] = None,
+                 limiter: Optional[RateLimiter] = None, base_url: Optional[str] = None):
+        # Retries are left to the limiter so they respect the shared limits
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self.model = model
+        self.cache = cache
+        self.usage = {"calls": 0, "input_tokens": 0, "output_tokens": 0,
+                      "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        # Token counts and latency per prompt stage (plan, validate, ...)
+        self.stages: Dict[str, Dict] = {}
+        self.timeout = timeout
+        # Bounds in-flight Claude requests and their rate across all callers
+        self.limiter = limiter or RateLimiter(
+            "anthropic", max_concurrency=max_concurrency, max_retries=max_retries)
+
+    @staticmethod
+    def _system(system: Optional[str]) -> List[Dict]:
+        # The static instructions form a cached prefix shared by every call
+        # of a stage; Claude only caches prefixes above a minimum length
+        if not system:
+            return []
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+    async def complete(self, prompt: str, max_tokens: int = 4096,
+                       system: Optional[str] = None, stage: Optional[str] = None) -> str:
+        """Send a single user prompt and return the text of the reply.
+
+        ``system`` holds the static instructions of the prompt, sent as a
+        cacheable system block; ``stage`` names the call in ``stage_stats``.
+        The reply is streamed only to measure the time to its first token.
+        """
+        async def request():
+            start = time.perf_counter()
+            first_token = None
+            async with self.client.messages.stream(
+                model=self.model,
+                max_tokens=max_tokens,
+                system=self._system(system),
+                messages=[{"role": "user", "content": prompt}]
+            ) as stream:
+                async for event in stream:
+                    if first_token is None and event.type == "content_block_delta":
+                        first_token = time.perf_counter() - start
+                message = await stream.get_final_message()
+            return message, time.perf_counter() - start, first_token
+
+        with metrics.span("llm.complete", stage=stage or "other", model=self.model):
+            message, seconds, first_token = await self.limiter.call(
+                lambda: asyncio.wait_for(request(), timeout=self.timeout))
+        self._record_usage(message.usage, stage, seconds, first_token)
+        return message.content[0].text
+
+    def _record_usage(self, usage, stage: Optional[str] = None,
+                      seconds: Optional[float] = None,
+                      first_token: Optional[float] = None) -> None:
+        counts = {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0
+        }
+        self.usage["calls"] += 1
+        for name, value in counts.items():
+            self.usage[name] += value
+        if metrics.enabled:
+            label = stage or "other"
+            for name, value in counts.items():
+                metrics.inc("llm_tokens", value, stage=label, kind=name[:-len("_tokens")])
+            if seconds is not None:
+                metrics.observe("llm_request_seconds", seconds, stage=label)
+                metrics.observe("llm_first_token_seconds",
+                                first_token if first_token is not None else seconds, stage=label)
+        if stage is None:
+            return
+
+        stats = self.stages.setdefault(stage, {
+            "calls": 0, **{name: 0 for name in counts}, "seconds": 0.0, "first_token_seconds": 0.0})
+        stats["calls"] += 1
+        for name, value in counts.items():
+            stats[name] += value
+        stats["seconds"] += seconds or 0.0
+        stats["first_token_seconds"] += first_token if first_token is not None else seconds or 0.0
+
+    def stage_stats(self) -> Dict[str, Dict]:
+        """Per-stage call counts, token totals and mean latencies."""
+        return {
+            stage: {
+                **{name: value for name, value in stats.items() if not name.endswith("seconds")},
+                "mean_seconds": stats["seconds"] / stats["calls"],
+                "mean_first_token_seconds": stats["first_token_seconds"] / stats["calls"]
+            }
+            for stage, stats in self.stages.items()
+        }
+
+    async def stream_tool_calls(self, prompt: str, tools: List[Dict],
+                                max_tokens: int = 4096, system: Optional[str] = None,
+                                stage: Optional[str] = None):
+        """Stream a tool-use reply, yielding each tool call once it is complete.
+
+        Yields ``{"name": ..., "input": {...}}`` dicts in the order Claude
+        emits them, so callers can act on a call while the rest of the reply
+        is still being generated.
+        """
+        # Tool definitions precede the system prompt, so both are cached
+        tools = [*tools[:-1], {**tools[-1], "cache_control": {"type": "ephemeral"}}]
+        async for event in self._stream(prompt, max_tokens, system, stage,
+                                        tools=tools, tool_choice={"type": "any"}):
+            if event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                yield {"name": event.content_block.name, "input": event.content_block.input}
+
+    async def stream_text(self, prompt: str, max_tokens: int = 4096,
+                          system: Optional[str] = None, stage: Optional[str] = None):
+        """Stream a plain text reply, yielding each text delta as it arrives."""
+        async for event in self._stream(prompt, max_tokens, system, stage):
+            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text
+
+    async def _stream(self, prompt: str, max_tokens: int, system: Optional[str],
+                      stage: Optional[str], **options):
+        """Stream the raw events of one reply within a limiter slot.
+
+        A failed stream is only retried if the caller has not received any
+        content yet.
+        """
+        attempt = 0
+        yielded = False
+        while True:
+            try:
+                async with self.limiter.slot():
+                    start = time.perf_counter()
+                    first_token = None
+                    async with self.client.messages.stream(
+                        model=self.model,
+                        max_tokens=max_tokens,
+                        system=self._system(system),
+                        messages=[{"role": "user", "content": prompt}],
+                        **options
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content_block_delta":
+                                if first_token is None:
+                                    first_token = time.perf_counter() - start
+                                yielded = True
+                            yield event
+                        message = await stream.get_final_message()
+                break
+            except Exception as e:
+                delay = None if yielded else self.limiter.backoff(e, attempt)
+                if delay is None:
+                    raise
+            attempt += 1
+            self.limiter.stats_counts["retries"] += 1
+            metrics.inc("rate_limiter_retries", limiter=self.limiter.name)
+            await asyncio.sleep(delay)
+        self._record_usage(message.usage, stage, time.perf_counter() - start, first_token)
+
+    async def complete_json(self, prompt: str, max_tokens: int = 4096,
+                            cache_stage: Optional[str] = None,
+                            semantic_key: Optional[str] = None,
+                            system: Optional[str] = None):
+        """Like ``complete`` but parses the reply as JSON.
+
+        With a ``cache_stage`` the reply is served from / stored in the
+        response cache; only replies that parse are cached. The stage also
+        names the call in ``stage_stats``.
+        """
+        if self.cache is None or cache_stage is None:
+            return json.loads(await self.complete(prompt, max_tokens=max_tokens,
+                                                  system=system, stage=cache_stage))
+
+        key = LLMResponseCache.key(self.model, max_tokens, prompt, system)
+        cached = await self.cache.get(key, cache_stage, semantic_key=semantic_key)
+        if cached is not None:
+            return json.loads(cached)
+
+        response = await self.complete(prompt, max_tokens=max_tokens,
+                                       system=system, stage=cache_stage)
+        result = json.loads(response)
+        await self.cache.set(key, cache_stage, response, semantic_key=semantic_key)
+        return result
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def stream_app_jsx(self, prompt: str, data_sample: str, schema: Optional[Dict] = None):
+        """Stream the code of an App.jsx that renders data of the given shape.
+
+        The component imports the full data from ./data.json; the prompt only
+        carries its schema and a (possibly shortened) sample.
+        """
+        system = """
+        Create a modern React App.jsx component that displays data in a clean, organized way.
         Use modern React patterns, hooks if needed, and proper jsx types.
+        Do not inline the data: import it with `import data from './data.json';`.
+        You get the shape of the data and a sample of it; the real data can be
+        larger, so render every item instead of hardcoding the sample.
         Return only the complete App.jsx code, nothing else. JUST RAW CODE"""
+        prompt = f"""
+        This was the original prompt: {prompt}, use information from that to structure the data
+        Data schema: {compact_json(schema) if schema is not None else "unknown"}
+        Data sample: {data_sample}"""
+
+        return self.stream_text(prompt, max_tokens=2000, system=system, stage="react")
 
-        response = self.client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=2000,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text
 
 
     async def analyze_website(self, url: str, actions: str) -> Dict:
         """Use LLM to analyze website and suggest possible actions."""
-        prompt = f"""Given this website URL: {url}
-        Suggest possible automation actions that could be performed on this website.
-        Consider common user flows and data extraction needs.
+        system = """Given a website URL, suggest possible automation actions that could be
+        performed on this website. Consider common user flows and data extraction needs.
         For each action, provide:
         1. Name (short, descriptive)
         2. Navigation goal (specific instructions for Skyvern)
         3. Data to extract (specific data points to collect)
         4. Required user inputs (fields needed from the user)
         5. Output schema (structure of extracted data)
-        
-        We also have existing actions suggested by the user.
-        These are:
-        {actions}
+        Also take into account the existing actions suggested by the user.
 
         Only give JSON output, no additional text.
         Format your response as JSON with this structure:
-        {{
+        {
             "actions": [
-                {{
+                {
                     "name": "action_name",
                     "navigation_goal": "detailed goal",
                     "data_extraction_goal": "what to extract",
                     "required_inputs": ["input1", "input2"],
-                    "output_schema": {{
+                    "output_schema": {
                         "field1": "description1",
                         "field2": "description2"
-                    }}
-                }}
+                    }
+                }
             ]
-        }}"""
+        }"""
+        prompt = f"""Website URL: {url}
+        Existing actions suggested by the user:
+        {actions}"""
 
-        response = self.client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return json.loads(response.content[0].text)
+        return await self.complete_json(prompt, max_tokens=1000, cache_stage="analyze",
+                                        system=system)
 
     async def generate_sql_query(self, natural_language_query: str) -> str:
         prompt = f"""Given this SQLite database schema:
@@ -235,42 +1781,658 @@ class LLMService:
         Generate a SQL query for this request: {natural_language_query}
         Return only the SQL query, nothing else."""
 
-        response = await self.client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=500,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content.strip()
+        response = await self.complete(prompt, max_tokens=500, stage="sql")
+        return response.strip()
     
     
+def output_schema(value):
+    """The shape of JSON-like data: keys, item shapes and scalar type names."""
+    if isinstance(value, dict):
+        return {key: output_schema(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [output_schema(value[0])] if value else []
+    return "null" if value is None else type(value).__name__
+
+
+def _sample(value, max_items: int, max_chars: int):
+    if isinstance(value, dict):
+        return {key: _sample(item, max_items, max_chars) for key, item in value.items()}
+    if isinstance(value, list):
+        sample = [_sample(item, max_items, max_chars) for item in value[:max_items]]
+        if len(value) > max_items:
+            sample.append(f"... {len(value) - max_items} more items")
+        return sample
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "..."
+    return value
+
+
+def summarize_data(value, max_chars: int = 4000) -> str:
+    """Minified JSON of ``value``, with lists and strings cut until it fits."""
+    max_items, max_string = 20, 500
+    text = json.dumps(value, separators=(",", ":"), default=str)
+    while len(text) > max_chars and (max_items > 1 or max_string > 20):
+        text = json.dumps(_sample(value, max_items, max_string),
+                          separators=(",", ":"), default=str)
+        max_items, max_string = max(max_items // 2, 1), max(max_string // 2, 20)
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+# Components shared by every template-rendered App.js
+REACT_TEMPLATE_COMPONENTS = """import data from './data.json';
+
+const LABELS = __LABELS__;
+
+function Label({ name }) {
+  const label = LABELS[name];
+  return <span title={label?.description}>{label?.label ?? name}</span>;
+}
+
+function Value({ value }) {
+  if (value === null || value === undefined || value === '') {
+    return <span style={{ color: '#999' }}>-</span>;
+  }
+  if (typeof value === 'object') {
+    return <code>{JSON.stringify(value)}</code>;
+  }
+  const text = String(value);
+  if (/^https?:\\/\\//.test(text)) {
+    return <a href={text} target="_blank" rel="noreferrer">{text}</a>;
+  }
+  return <span>{text}</span>;
+}
+
+function Fields({ record, names }) {
+  return (
+    <dl style={{ display: 'grid', gridTemplateColumns: 'max-content 1fr', gap: '0.5rem 1.5rem' }}>
+      {names.map((name) => (
+        <React.Fragment key={name}>
+          <dt style={{ fontWeight: 600 }}><Label name={name} /></dt>
+          <dd style={{ margin: 0 }}><Value value={record[name]} /></dd>
+        </React.Fragment>
+      ))}
+    </dl>
+  );
+}
+
+function Table({ rows }) {
+  const columns = [...new Set(rows.flatMap((row) => Object.keys(row ?? {})))];
+  return (
+    <table style={{ borderCollapse: 'collapse', width: '100%' }}>
+      <thead>
+        <tr>
+          {columns.map((column) => (
+            <th key={column} style={{ textAlign: 'left', borderBottom: '2px solid #ddd', padding: '0.5rem' }}>
+              <Label name={column} />
+            </th>
+          ))}
+        </tr>
+      </thead>
+      <tbody>
+        {rows.map((row, index) => (
+          <tr key={index}>
+            {columns.map((column) => (
+              <td key={column} style={{ borderBottom: '1px solid #eee', padding: '0.5rem' }}>
+                <Value value={row?.[column]} />
+              </td>
+            ))}
+          </tr>
+        ))}
+      </tbody>
+    </table>
+  );
+}
+
+function List({ items }) {
+  return <ul>{items.map((item, index) => <li key={index}><Value value={item} /></li>)}</ul>;
+}
+
+function Section({ name, children }) {
+  return (
+    <section style={{ marginTop: '2rem' }}>
+      <h2 style={{ fontSize: '1.25rem' }}><Label name={name} /></h2>
+      {children}
+    </section>
+  );
+}
+"""
+
+
+def _humanize(name: str) -> str:
+    words = name.replace("_", " ").replace("-", " ").strip()
+    return words[:1].upper() + words[1:]
+
+
+def render_react_template(prompt: str, data: Dict, declared_schema: Dict) -> str:
+    """Deterministic App.js for outputs whose fields the actions declared.
+
+    Top-level scalars are shown as one field list, lists of records as
+    tables, other lists as bullet lists and nested objects as field lists.
+    Declared field descriptions become the labels' tooltips.
+    """
+    names = list(data)
+    for value in data.values():
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, dict):
+                names.extend(item)
+    labels = {name: {"label": _humanize(name),
+                     "description": str(declared_schema.get(name) or "")}
+              for name in dict.fromkeys(names)}
+
+    def expression(name: str) -> str:
+        return f"data[{json.dumps(name)}]"
+
+    scalars = [name for name, value in data.items() if not isinstance(value, (dict, list))]
+    sections = []
+    if scalars:
+        sections.append(f"<Fields record={{data}} names={{{json.dumps(scalars)}}} />")
+    for name, value in data.items():
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            body = f"<Table rows={{{expression(name)}}} />"
+        elif isinstance(value, list):
+            body = f"<List items={{{expression(name)}}} />"
+        elif isinstance(value, dict):
+            body = f"<Fields record={{{expression(name)}}} names={{Object.keys({expression(name)})}} />"
+        else:
+            continue
+        sections.append(f"<Section name={{{json.dumps(name)}}}>\n        {body}\n      </Section>")
+
+    components = REACT_TEMPLATE_COMPONENTS.replace("__LABELS__", json.dumps(labels, indent=2))
+    body = "\n      ".join(sections)
+    return f"""import React from 'react';
+{components}
+export default function App() {{
+  return (
+    <main style={{{{ fontFamily: 'system-ui, sans-serif', maxWidth: 960, margin: '2rem auto', padding: '0 1rem' }}}}>
+      <h1 style={{{{ fontSize: '1.5rem' }}}}>{{{json.dumps(prompt)}}}</h1>
+      {body}
+    </main>
+  );
+}}
+"""
+
+
+class GeneratedAppStore:
+    """Content-addressed store of the React apps generated per execution.
+
+    Components and data documents are stored once per SHA-256 digest under
+    ``objects/`` and each execution has a small manifest pointing at its
+    pair, so the many executions that share a layout share one component
+    file. Only the ``max_executions`` most recently written or read
+    executions are kept; evicting one deletes the objects nothing else
+    references. Manifests are reloaded on startup.
+    """
+
+    def __init__(self, root: str = "generated_apps", max_executions: int = 1000):
+        self.root = Path(root)
+        self.objects_path = self.root / "objects"
+        self.executions_path = self.root / "executions"
+        self.max_executions = max_executions
+        self._manifests: "OrderedDict[str, Dict]" = OrderedDict()
+        self._references: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self.evicted = 0
+        self._load()
+
+    def _load(self) -> None:
+        self.objects_path.mkdir(parents=True, exist_ok=True)
+        self.executions_path.mkdir(parents=True, exist_ok=True)
+        paths = sorted(self.executions_path.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in paths:
+            try:
+                manifest = json.loads(path.read_text())
+            except (OSError, ValueError):
+                path.unlink(missing_ok=True)
+                continue
+            self._manifests[path.stem] = manifest
+            for digest in (manifest["component"], manifest["data"]):
+                self._references[digest] = self._references.get(digest, 0) + 1
+        for path in self.objects_path.iterdir():
+            if path.name not in self._references:
+                # Left behind by an eviction that was interrupted
+                path.unlink(missing_ok=True)
+
+    @staticmethod
+    def digest(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_path / digest
+
+    def _manifest_path(self, execution_id: str) -> Path:
+        return self.executions_path / f"{execution_id}.json"
+
+    @staticmethod
+    def _write_atomic(path: Path, text: str) -> None:
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        temp_path.write_text(text)
+        os.replace(temp_path, path)
+
+    async def put(self, execution_id: str, component: str, data: str,
+                  renderer: str) -> Dict:
+        """Store an execution's component and serialized data, replacing any earlier pair."""
+        manifest = {
+            "component": self.digest(component),
+            "data": self.digest(data),
+            "renderer": renderer,
+            "created_at": datetime.now().isoformat()
+        }
+        async with self._lock:
+            for digest, text in ((manifest["component"], component), (manifest["data"], data)):
+                if digest in self._references:
+                    self.deduplicated += 1
+                else:
+                    await asyncio.to_thread(self._write_atomic, self._object_path(digest), text)
+                self._references[digest] = self._references.get(digest, 0) + 1
+
+            previous = self._manifests.pop(execution_id, None)
+            await asyncio.to_thread(self._write_atomic, self._manifest_path(execution_id),
+                                    json.dumps(manifest))
+            self._manifests[execution_id] = manifest
+            if previous:
+                await self._release(previous)
+            while len(self._manifests) > self.max_executions:
+                evicted_id, evicted = self._manifests.popitem(last=False)
+                await asyncio.to_thread(self._manifest_path(evicted_id).unlink, missing_ok=True)
+                await self._release(evicted)
+                self.evicted += 1
+        return manifest
+
+    async def _release(self, manifest: Dict) -> None:
+        for digest in (manifest["component"], manifest["data"]):
+            self._references[digest] -= 1
+            if not self._references[digest]:
+                del self._references[digest]
+                await asyncio.to_thread(self._object_path(digest).unlink, missing_ok=True)
+
+    def manifest(self, execution_id: str) -> Optional[Dict]:
+        manifest = self._manifests.get(execution_id)
+        if manifest is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._manifests.move_to_end(execution_id)
+        return manifest
+
+    async def read(self, digest: str) -> Optional[str]:
+        try:
+            return await asyncio.to_thread(self._object_path(digest).read_text)
+        except FileNotFoundError:
+            # Evicted since its manifest was looked up
+            return None
+
+    def stats(self) -> Dict:
+        return {
+            "executions": len(self._manifests),
+            "objects": len(self._references),
+            "max_executions": self.max_executions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "deduplicated": self.deduplicated,
+            "evicted": self.evicted
+        }
+
+
 class ReactWriter:
-    def __init__(self, llm: LLMService):
+    """Generates the React app that displays an execution's outputs.
+
+    Each execution's component and data are kept apart in a
+    GeneratedAppStore, so concurrent executions never overwrite each other
+    and nothing is written into the CRA source tree. The component imports
+    its data from ./data.json and the prompt only carries the data's schema
+    and a bounded sample, so generated code is reusable for any data of the
+    same shape and is cached by (prompt, schema). New code is streamed to
+    the execution's event subscribers while it is generated.
+
+    Outputs whose fields were all declared in the actions' output schemas
+    are rendered from templates without Claude; with ``polish`` the
+    template is only a first version that generated code then replaces.
+    """
+
+    def __init__(self, llm: LLMService, store: GeneratedAppStore,
+                 events: Optional["ExecutionEventBus"] = None, cache_size: int = 128,
+                 max_sample_chars: int = 4000, polish: bool = False):
         self.llm = llm
-        self.app_path = Path("cra/src/App.js")
+        self.store = store
+        self.events = events
+        self.polish = polish
+        self.max_sample_chars = max_sample_chars
+        self.cache = TTLCache(max_size=cache_size)
+        # Code generation status by execution ID: pending, running, completed, failed
+        self.statuses = TTLCache(max_size=1024)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def expect(self, execution_id: str) -> None:
+        """Mark that an execution's outputs will be rendered once it completes."""
+        self.statuses.set(execution_id, "pending")
+
+    def status(self, execution_id: str) -> Optional[str]:
+        return self.statuses.get(execution_id)
+
+    def abandon(self, execution_id: str, error: str) -> None:
+        """Give up on an expected app, for an execution that failed before rendering."""
+        self._publish(execution_id, {"status": "failed", "error": error})
+
+    def start(self, execution_id: str, prompt: str, unstructured_data,
+              declared_schema: Optional[Dict] = None) -> asyncio.Task:
+        """Generate the app in the background, off the execution's critical path."""
+        self.expect(execution_id)
+        task = asyncio.create_task(self.write_app_jsx(
+            prompt, unstructured_data, execution_id, declared_schema))
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            # Failures were already reported to subscribers
+            task.exception()
+
+    def _publish(self, execution_id: Optional[str], event: Dict) -> None:
+        if execution_id is None:
+            return
+        if "status" in event:
+            self.statuses.set(execution_id, event["status"])
+        if self.events:
+            self.events.publish(execution_id, {
+                "type": "codegen", "execution_id": execution_id, **event})
+
+    async def write_app_jsx(self, prompt: str, unstructured_data,
+                            execution_id: Optional[str] = None,
+                            declared_schema: Optional[Dict] = None) -> str:
+        schema = output_schema(unstructured_data)
+        key = hashlib.sha256(f"{prompt}\n{json.dumps(schema, sort_keys=True)}".encode("utf-8")).hexdigest()
+        self._publish(execution_id, {"status": "running"})
+        try:
+            data = json.dumps(unstructured_data, default=str)
+            renderer = "template"
+            react_code = None
+            if isinstance(unstructured_data, dict) and unstructured_data and declared_schema and \
+                    set(unstructured_data) <= set(declared_schema):
+                react_code = render_react_template(prompt, unstructured_data, declared_schema)
+                if self.polish:
+                    await self._store(execution_id, react_code, data, renderer)
+                    self._publish(execution_id, {"renderer": renderer, "code": react_code})
+                    react_code = None
+
+            if react_code is None:
+                react_code = self.cache.get(key)
+                renderer = "cache" if react_code is not None else "llm"
+                if react_code is None:
+                    react_code = await self._generate(prompt, unstructured_data, schema, execution_id)
+                    self.cache.set(key, react_code)
+            manifest = await self._store(execution_id, react_code, data, renderer)
+        except Exception as e:
+            self._publish(execution_id, {"status": "failed", "error": str(e) or type(e).__name__})
+            raise
+
+        self._publish(execution_id, {"status": "completed", "renderer": renderer,
+                                     "component": manifest and manifest["component"],
+                                     "code": react_code})
+        return react_code
+
+    async def _store(self, execution_id: Optional[str], react_code: str, data: str,
+                     renderer: str) -> Optional[Dict]:
+        if execution_id is None:
+            return None
+        return await self.store.put(execution_id, react_code, data, renderer)
+
+    async def _generate(self, prompt: str, unstructured_data, schema,
+                        execution_id: Optional[str]) -> str:
+        sample = summarize_data(unstructured_data, self.max_sample_chars)
+        chunks = []
+        async for chunk in self.llm.stream_app_jsx(prompt, sample, schema):
+            chunks.append(chunk)
+            self._publish(execution_id, {"delta": chunk})
+        return "".join(chunks)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+
+@dataclass
+class PollEntry:
+    """A Skyvern task being watched by the TaskPoller."""
+    task_id: str
+    deadline: float
+    next_poll: float
+    interval: float
+    futures: List[asyncio.Future] = field(default_factory=list)
+    polls: int = 0
+    watched_at: float = 0.0
+
+
+class TaskPoller:
+    """Central poller and completion registry for outstanding Skyvern tasks.
+
+    Instead of one sleep loop per task, a single background loop tracks every
+    watched task ID and on each tick checks the tasks that are due, all at
+    once. Each task backs off from ``min_interval`` to ``max_interval`` (with
+    jitter) the longer it runs, and waiters receive the final status through
+    a future. Webhook callbacks resolve the same futures via ``resolve``, in
+    which case polling only serves as a fallback.
+    """
+
+    def __init__(self, skyvern: "SkyvernService", min_interval: float = 1.0,
+                 max_interval: float = 15.0, backoff: float = 1.5,
+                 jitter: float = 0.2, max_batch: int = 50):
+        self.skyvern = skyvern
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.max_batch = max_batch
+        self.entries: Dict[str, PollEntry] = {}
+        # Callbacks that arrived before anyone started waiting on the task
+        self.early_results: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_early_results = 1000
+        self._wakeup = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def watch(self, task_id: str, timeout: float = 3000,
+              first_poll_delay: Optional[float] = None) -> asyncio.Future:
+        """Start tracking a task and return a future for its final status."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        future = loop.create_future()
+        if task_id in self.early_results:
+            future.set_result(self.early_results.pop(task_id))
+            return future
+
+        if first_poll_delay is None:
+            first_poll_delay = self._jittered(self.min_interval)
+        entry = self.entries.get(task_id)
+        if entry is None:
+            entry = PollEntry(
+                task_id=task_id,
+                deadline=now + timeout,
+                next_poll=now + first_poll_delay,
+                interval=self.min_interval,
+                watched_at=now
+            )
+            self.entries[task_id] = entry
+        else:
+            entry.deadline = max(entry.deadline, now + timeout)
+        entry.futures.append(future)
 
-    async def write_app_jsx(self, prompt: str, unstructured_data: str) -> None:
-        # Generate React code using LLM
-        react_code = await self.llm.createAppJsx(prompt, unstructured_data)
-        
-        # Create directories if they don't exist
-        self.app_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Write the generated code to App.js
-        with open(self.app_path, "w") as f:
-            f.write(react_code)
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        return future
 
+    def resolve(self, task_id: str, status: Dict) -> bool:
+        """Complete a task from an external signal such as a webhook.
+
+        Returns False if the status is not terminal and was ignored.
+        """
+        if status.get("status") not in TERMINAL_TASK_STATUSES:
+            return False
+        entry = self.entries.get(task_id)
+        if entry is not None:
+            self._finish(entry, result=status, source="webhook")
+        else:
+            self.early_results[task_id] = status
+            while len(self.early_results) > self.max_early_results:
+                self.early_results.popitem(last=False)
+        return True
+
+    def _finish(self, entry: PollEntry, result: Optional[Dict] = None,
+                error: Optional[BaseException] = None, source: str = "poll") -> None:
+        self.entries.pop(entry.task_id, None)
+        if metrics.enabled:
+            status = "timeout" if error is not None else _plain(result.get("status"))
+            metrics.observe("skyvern_task_seconds",
+                            asyncio.get_running_loop().time() - entry.watched_at,
+                            status=status, source=source)
+            metrics.observe("skyvern_task_polls", entry.polls)
+        for future in entry.futures:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def _poll(self, entry: PollEntry) -> None:
+        entry.polls += 1
+        try:
+            status = await self.skyvern.get_task_status(entry.task_id)
+        except Exception:
+            # Transient API errors just push the next check further out
+            status = None
+
+        if status and status.get("status") in TERMINAL_TASK_STATUSES:
+            self._finish(entry, result=status)
+            return
+
+        entry.interval = min(entry.interval * self.backoff, self.max_interval)
+        entry.next_poll = asyncio.get_running_loop().time() + \
+            self._jittered(entry.interval)
+
+    async def _run(self) -> None:
+        # Status checks never hold up interactive requests
+        request_priority.set(Priority.BATCH)
+        loop = asyncio.get_running_loop()
+        while self.entries:
+            self._wakeup.clear()
+            now = loop.time()
+
+            for entry in list(self.entries.values()):
+                # Drop tasks whose waiters have all gone away
+                if all(f.done() for f in entry.futures):
+                    self.entries.pop(entry.task_id, None)
+                elif now >= entry.deadline:
+                    self._finish(entry, error=TimeoutError(
+                        f"Task {entry.task_id} did not complete in time"))
+
+            due = sorted((e for e in self.entries.values() if e.next_poll <= now),
+                         key=lambda e: e.next_poll)[:self.max_batch]
+            if due:
+                for entry in due:
+                    metrics.observe("skyvern_poll_lag_seconds", now - entry.next_poll)
+                await asyncio.gather(*(self._poll(e) for e in due))
+                continue
+
+            if not self.entries:
+                break
+            next_wake = min(min(e.next_poll, e.deadline)
+                            for e in self.entries.values())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(),
+                                       timeout=max(next_wake - now, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self) -> None:
+        if self._loop_task is not None and not self._loop_task.done():
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+        for entry in list(self.entries.values()):
+            for future in entry.futures:
+                future.cancel()
+        self.entries.clear()
+
+
+def task_not_created(error: BaseException) -> bool:
+    """Whether a failed task creation request certainly started no task.
+
+    True if the request was throttled or never reached Skyvern; timeouts
+    and server errors may come after the task was accepted.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
 
 
 class SkyvernService:
     """Service for interacting with Skyvern API."""
 
-    def __init__(self, api_key: str, base_url: str = "https://api.skyvern.com/api/v1"):
+    def __init__(self, api_key: str, base_url: str = "https://api.skyvern.com/api/v1",
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, http2: bool = True,
+                 timeout: float = 30.0, min_poll_interval: float = 1.0,
+                 max_poll_interval: float = 15.0,
+                 webhook_callback_url: Optional[str] = None,
+                 webhook_fallback_delay: float = 120.0,
+                 limiter: Optional[RateLimiter] = None):
         self.api_key = api_key
+        # Shared rate and concurrency limits of every Skyvern API request
+        self.limiter = limiter or RateLimiter("skyvern", max_concurrency=max_connections)
         self.base_url = base_url
+        self.webhook_callback_url = webhook_callback_url
+        # With webhooks enabled, polling only starts after this many seconds
+        self.webhook_fallback_delay = webhook_fallback_delay
         self.headers = {
             "x-api-key": api_key,
             "Content-Type": "application/json"
         }
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        # HTTP/2 needs the optional h2 package (httpx[http2])
+        try:
+            import h2  # noqa: F401
+            self.http2 = http2
+        except ImportError:
+            self.http2 = False
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self.poller = TaskPoller(self, min_interval=min_poll_interval,
+                                 max_interval=max_poll_interval)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                limits=self.limits,
+                http2=self.http2,
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def close(self) -> None:
+        await self.poller.close()
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
     async def create_task(self, url: str, navigation_goal: str,
                           data_extraction_goal: str,
@@ -285,48 +2447,137 @@ class SkyvernService:
             "navigation_payload": navigation_payload or {},
             "proxy_location": "RESIDENTIAL"
         }
+        if self.webhook_callback_url:
+            json["webhook_callback_url"] = self.webhook_callback_url
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/tasks/",
-                headers=self.headers,
-                json=json
-            )
-            response.raise_for_status()
-            return response.json()
+        # Each accepted request starts a (paid) browser task, so only
+        # failures that certainly created none are retried
+        return await self.limiter.call(
+            lambda: self._request("POST", "/tasks/", "create_task", json=json),
+            retryable=task_not_created)
 
     async def get_task_status(self, task_id: str) -> Dict:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/tasks/{task_id}",
-                headers=self.headers
-            )
+        return await self.limiter.call(
+            lambda: self._request("GET", f"/tasks/{task_id}", "get_task"))
+
+    async def _request(self, method: str, path: str, operation: str, **kwargs) -> Dict:
+        with metrics.timed("skyvern_request_seconds", f"skyvern.{operation}",
+                           {"http.path": path}, operation=operation):
+            response = await self.client.request(method, path, **kwargs)
             response.raise_for_status()
             return response.json()
 
-    async def wait_for_completion(self, task_id: str,
-                                  polling_interval: int = 10,
-                                  timeout: int = 3000) -> Dict:
-        start_time = datetime.now()
-        while True:
-            if (datetime.now() - start_time).seconds > timeout:
-                raise TimeoutError(
-                    f"Task {task_id} did not complete within {timeout} seconds")
-
-            status = await self.get_task_status(task_id)
-            if status["status"] in [TaskStatus.COMPLETED, TaskStatus.FAILED,
-                                    TaskStatus.TERMINATED, TaskStatus.CANCELED]:
-                return status
-
-            await asyncio.sleep(polling_interval)
+    def verify_webhook(self, body: bytes, signature: Optional[str]) -> bool:
+        """Check the x-skyvern-signature HMAC of a webhook body."""
+        if not signature or not self.api_key:
+            return False
+        expected = hmac.new(self.api_key.encode("utf-8"), msg=body,
+                            digestmod=hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def handle_webhook(self, payload: Dict) -> bool:
+        """Resolve the waiter for a task from a webhook callback payload."""
+        task_id = payload.get("task_id")
+        if not task_id:
+            return False
+        return self.poller.resolve(task_id, payload)
+
+    async def wait_for_completion(self, task_id: str, timeout: int = 3000) -> Dict:
+        first_poll_delay = None
+        if self.webhook_callback_url:
+            first_poll_delay = self.webhook_fallback_delay
+        return await self.poller.watch(task_id, timeout=timeout,
+                                       first_poll_delay=first_poll_delay)
 
 
 class WebsiteBlockManager:
-    def __init__(self, db: MarqoDatabase, llm: LLMService):
+    def __init__(self, db: MarqoDatabase, llm: LLMService, block_cache_size: int = 1024,
+                 action_cache_size: int = 2048, action_cache_ttl: float = 300):
         self.db = db
         self.llm = llm
+        # LRU of normalized host -> block, in front of the exact host index
+        self.block_cache = TTLCache(max_size=block_cache_size)
+        # Decoded actions by ID, refreshed on write through this manager
+        self.action_cache = TTLCache(max_size=action_cache_size, ttl=action_cache_ttl)
+        # In-flight block creations by normalized host, shared by duplicates
+        self._block_creations: Dict[str, asyncio.Task] = {}
+
+    async def find_block(self, url: str) -> Optional[Dict]:
+        """Find the stored block for a site by its normalized host.
+
+        Only blocks created before the host index existed need the semantic
+        search fallback, and its hits must still be on the same host.
+        """
+        # A block being created for this host is only usable once its
+        # actions are stored
+        pending = self._block_creations.get(normalize_host(url))
+        if pending:
+            await asyncio.wait([pending])
+        return await self._lookup_block(url)
+
+    async def _lookup_block(self, url: str) -> Optional[Dict]:
+        host = normalize_host(url)
+        block = self.block_cache.get(host)
+        if block:
+            return block
+
+        block = await self.db.find_block_by_host(host)
+        if not block:
+            for hit in await self.db.search_blocks(url):
+                if normalize_host(hit["url"]) == host:
+                    await self.db.index_block_keys(hit["_id"], hit["url"])
+                    block = hit
+                    break
+
+        if block:
+            self.block_cache.set(host, block)
+        return block
+
+    def _start_creation(self, url: str, creation: Awaitable[Tuple[Dict, bool]]) -> asyncio.Task:
+        host = normalize_host(url)
+        task = asyncio.create_task(creation)
+        self._block_creations[host] = task
+        task.add_done_callback(lambda _: self._block_creations.pop(host, None))
+        return task
 
     async def create_block(self, name: str, url: str, acts: str) -> Dict:
+        """Create a block and its suggested actions.
+
+        Concurrent calls for the same host share one creation, so the site
+        is only analyzed once.
+        """
+        task = self._block_creations.get(normalize_host(url)) or \
+            self._start_creation(url, self._created(self._create_block(name, url, acts)))
+        block, _ = await asyncio.shield(task)
+        return block
+
+    async def find_or_create_block(self, name: str, url: str, acts: str) -> Tuple[Dict, bool]:
+        """Return ``(block, created)`` for the site of ``url``.
+
+        A created block is returned as by ``create_block``, its actions
+        analyzed from ``acts``; otherwise it is the stored block, as by
+        ``find_block``. The lookup runs inside the host's shared creation, so
+        concurrent calls for one new site analyze it only once.
+        """
+        task = self._block_creations.get(normalize_host(url))
+        if task is None:
+            task = self._start_creation(url, self._find_or_create_block(name, url, acts))
+            return await asyncio.shield(task)
+        # Joined another caller's creation, whose actions came from its acts
+        await asyncio.shield(task)
+        return await self._lookup_block(url), False
+
+    async def _find_or_create_block(self, name: str, url: str, acts: str) -> Tuple[Dict, bool]:
+        block = await self._lookup_block(url)
+        if block:
+            return block, False
+        return await self._create_block(name, url, acts), True
+
+    @staticmethod
+    async def _created(creation: Awaitable[Dict]) -> Tuple[Dict, bool]:
+        return await creation, True
+
+    async def _create_block(self, name: str, url: str, acts: str) -> Dict:
         block_data = {
             "name": name,
             "type": "website_based",
@@ -334,21 +2585,18 @@ class WebsiteBlockManager:
             "actions": acts
         }
         block_id = await self.db.store_block(block_data)
+        self.block_cache.set(normalize_host(url), {"_id": block_id, **block_data})
         suggestions = await self.llm.analyze_website(url, acts)
 
-        actions = []
-        for action_info in suggestions["actions"]:
-            action_data = {
-                "block_id": block_id,
-                "name": action_info["name"],
-                "navigation_goal": action_info["navigation_goal"],
-                "data_extraction_goal": action_info["data_extraction_goal"],
-                "required_inputs": action_info["required_inputs"],
-                "output_schema": action_info["output_schema"],
-                "url": url
-            }
-            action_id = await self.db.store_action(action_data)
-            actions.append(action_id)
+        actions = await self.store_actions([{
+            "block_id": block_id,
+            "name": action_info["name"],
+            "navigation_goal": action_info["navigation_goal"],
+            "data_extraction_goal": action_info["data_extraction_goal"],
+            "required_inputs": action_info["required_inputs"],
+            "output_schema": action_info["output_schema"],
+            "url": url
+        } for action_info in suggestions["actions"]])
 
         return {
             "id": block_id,
@@ -358,15 +2606,49 @@ class WebsiteBlockManager:
             "actions": actions
         }
 
+    async def store_actions(self, actions: List[Dict]) -> List[str]:
+        action_ids = await self.db.store_actions(actions)
+        for action_id, action_data in zip(action_ids, actions):
+            self.action_cache.set(action_id, {"_id": action_id, **action_data})
+        return action_ids
+
+    def invalidate_action(self, action_id: str) -> None:
+        self.action_cache.pop(action_id)
+
+    async def update_action(self, action_id: str, fields: Dict) -> None:
+        await self.db.update_action(action_id, fields)
+        self.invalidate_action(action_id)
+
     async def get_action(self, action_id: str) -> Dict:
-        return await self.db.get_action(action_id)
+        return (await self.get_actions([action_id])).get(action_id)
+
+    async def get_actions(self, action_ids: List[str]) -> Dict[str, Dict]:
+        """Resolve actions by ID, fetching only cache misses in one request."""
+        actions = {}
+        missing = []
+        for action_id in dict.fromkeys(action_ids):
+            action = self.action_cache.get(action_id)
+            if action is None:
+                missing.append(action_id)
+            else:
+                actions[action_id] = action
+
+        if missing:
+            for action_id, action in (await self.db.get_actions(missing)).items():
+                self.action_cache.set(action_id, action)
+                actions[action_id] = action
+        return actions
 
 
 class ActionExecution:
     """Tracks the execution of an action."""
 
-    def __init__(self, action_id: str, inputs: Dict):
+    def __init__(self, action_id: str, inputs: Dict, step: int = 0,
+                 node_key: Optional[str] = None):
         self.id = str(uuid.uuid4())
+        self.step = step
+        # Flow graph node this record belongs to, used to resume executions
+        self.node_key = node_key
         self.action_id = action_id
         self.inputs = inputs
         self.status = ActionExecutionStatus.PENDING
@@ -376,10 +2658,13 @@ class ActionExecution:
         self.started_at = None
         self.completed_at = None
         self.output = None
+        # Output reused from a cached or concurrent identical run
+        self.cache_hit = False
 
     def to_dict(self) -> Dict:
         return {
             "id": self.id,
+            "step": self.step,
             "action_id": self.action_id,
             "inputs": self.inputs,
             "status": self.status,
@@ -388,15 +2673,32 @@ class ActionExecution:
             "error": self.error,
             "started_at": self.started_at,
             "completed_at": self.completed_at,
-            "output": self.output
+            "output": self.output,
+            "cache_hit": self.cache_hit,
+            "node_key": self.node_key
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ActionExecution":
+        """Rebuild a record from its stored step."""
+        action_execution = cls(data["action_id"], data.get("inputs") or {},
+                               step=data["step"], node_key=data.get("node_key"))
+        action_execution.id = data["id"]
+        action_execution.status = ActionExecutionStatus(data["status"])
+        action_execution.skyvern_task_id = data.get("skyvern_task_id")
+        action_execution.output = data.get("output")
+        action_execution.error = data.get("error")
+        action_execution.started_at = data.get("started_at")
+        action_execution.completed_at = data.get("completed_at")
+        action_execution.cache_hit = bool(data.get("cache_hit"))
+        return action_execution
+
 
 class FlowExecution:
     """Tracks the execution of a flow."""
 
-    def __init__(self, flow_id: str, initial_inputs: Dict):
-        self.id = str(uuid.uuid4())
+    def __init__(self, flow_id: str, initial_inputs: Dict, id: Optional[str] = None):
+        self.id = id or str(uuid.uuid4())
         self.flow_id = flow_id
         self.initial_inputs = initial_inputs
         self.action_executions: List[ActionExecution] = []
@@ -404,6 +2706,7 @@ class FlowExecution:
         self.started_at = None
         self.completed_at = None
         self.outputs = None
+        self.error = None
 
     def to_dict(self) -> Dict:
         return {
@@ -414,95 +2717,565 @@ class FlowExecution:
             "status": self.status,
             "started_at": self.started_at,
             "completed_at": self.completed_at,
-            "outputs": self.outputs
+            "outputs": self.outputs,
+            "error": self.error
+        }
+
+
+def build_action_graph(flow_actions: List[Dict]) -> "OrderedDict[str, Dict]":
+    """Turn a flow's action configs into a dependency graph.
+
+    Each config is ``{"id": action_id, "key": optional node name,
+    "depends_on": [upstream keys]}``. The key defaults to the action ID and
+    the outputs of the upstream actions are merged into the action's inputs.
+    Configs without ``depends_on`` have no upstream actions and run
+    concurrently.
+    """
+    graph: "OrderedDict[str, Dict]" = OrderedDict()
+    for index, action_config in enumerate(flow_actions):
+        key = action_config.get("key") or action_config["id"]
+        if key in graph:
+            key = f"{key}#{index}"
+        # A repeated dependency is one edge, not two
+        graph[key] = {**action_config, "key": key,
+                      "depends_on": list(dict.fromkeys(action_config.get("depends_on") or []))}
+
+    for key, action_config in graph.items():
+        unknown = [d for d in action_config["depends_on"] if d not in graph]
+        if unknown:
+            raise ValueError(f"Action {key} depends on unknown actions: {unknown}")
+
+    # Kahn's algorithm, only to reject cycles up front
+    remaining = {key: len(config["depends_on"]) for key, config in graph.items()}
+    ready = [key for key, count in remaining.items() if count == 0]
+    visited = 0
+    while ready:
+        current = ready.pop()
+        visited += 1
+        for key, config in graph.items():
+            if current in config["depends_on"]:
+                remaining[key] -= 1
+                if remaining[key] == 0:
+                    ready.append(key)
+    if visited != len(graph):
+        raise ValueError("Flow actions contain a dependency cycle")
+
+    return graph
+
+
+PLANNER_TOOLS = [
+    {
+        "name": "add_step",
+        "description": "Add one action to the flow, in execution order. Reuse a "
+                       "candidate action by giving its action_id, otherwise describe "
+                       "a new action with url, name and goals.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "key": {"type": "string", "description": "Short unique name for this step"},
+                "action_id": {"type": "string", "description": "ID of a candidate action to reuse"},
+                "url": {"type": "string"},
+                "name": {"type": "string"},
+                "navigation_goal": {"type": "string"},
+                "data_extraction_goal": {"type": "string"},
+                "required_inputs": {"type": "array", "items": {"type": "string"}},
+                "depends_on": {
+                    "type": "array", "items": {"type": "string"},
+                    "description": "Keys of earlier steps whose output this step needs"
+                }
+            },
+            "required": ["key"]
+        }
+    },
+    {
+        "name": "finish_flow",
+        "description": "Call once after all steps were added.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "flow_name": {"type": "string"},
+                "flow_description": {"type": "string"},
+                "inputs": {
+                    "type": "object",
+                    "description": "Values for required inputs found in the user request"
+                }
+            },
+            "required": ["flow_name", "flow_description"]
         }
+    }
+]
+
+
+def compact_action(action: Dict) -> Dict:
+    """The fields of a stored action that planning prompts need."""
+    return {
+        "id": action["_id"],
+        "name": action["name"],
+        "url": action["url"],
+        "navigation_goal": action["navigation_goal"],
+        "data_extraction_goal": action["data_extraction_goal"],
+        "required_inputs": action["required_inputs"]
+    }
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class ExecutionEventBus:
+    """In-process pub/sub of execution progress events.
+
+    Subscribers get a bounded queue per execution ID; when a subscriber
+    falls behind, its oldest undelivered events are dropped.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, execution_id: str) -> asyncio.Queue:
+        subscriber: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self.subscribers.setdefault(execution_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, execution_id: str, subscriber: asyncio.Queue) -> None:
+        subscribers = self.subscribers.get(execution_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.subscribers[execution_id]
+
+    def publish(self, execution_id: str, event: Dict) -> None:
+        for subscriber in self.subscribers.get(execution_id, ()):
+            if subscriber.full():
+                subscriber.get_nowait()
+            subscriber.put_nowait(event)
 
 
 class WebsiteFlowManager:
-    def __init__(self, db: MarqoDatabase, block_manager: WebsiteBlockManager, skyvern: SkyvernService, llm: LLMService):
+    def __init__(self, db: MarqoDatabase, block_manager: WebsiteBlockManager, skyvern: SkyvernService, llm: LLMService,
+                 max_parallel_actions: int = 5, max_concurrent_actions: int = 50,
+                 planner: str = "pipeline", planning_concurrency: int = 4,
+                 events: Optional[ExecutionEventBus] = None,
+                 result_cache: Optional[ActionResultCache] = None):
         self.db = db
+        self.events = events
+        # Opt-in reuse of results of identical action runs
+        self.result_cache = result_cache
         self.block_manager = block_manager
         self.skyvern = skyvern
         self.llm = llm
-        
-    async def continue_flow_execution(self, flow_id: str, additional_inputs: Dict) -> FlowExecution:
-        # Get flow from Marqo
-        flow_result = self.db.client.index(self.db.flows_index).get_document(flow_id)
+        # Per-flow and process-wide limits on concurrently running actions
+        self.max_parallel_actions = max_parallel_actions
+        self.action_semaphore = asyncio.Semaphore(max_concurrent_actions)
+        # "pipeline" (plan, validate, optimize, extract) or "single_pass"
+        self.planner = planner
+        # Planned actions resolved at once (block lookup, search, analysis)
+        self.planning_concurrency = planning_concurrency
+
+    async def resumable_execution(self, flow_id: str,
+                                  execution_id: Optional[str] = None) -> Optional[Dict]:
+        """The given failed execution of a flow, or its latest one if that failed.
+
+        Without ``execution_id`` None is returned unless the flow's most
+        recently started execution failed.
+
+        Only failed executions can be resumed: queued and running ones are
+        owned by an ExecutionQueue worker and completed ones are final.
+        """
+        flow_result = await self.db.get_flow(flow_id)
         if not flow_result:
             raise ValueError(f"Flow {flow_id} not found")
-            
-        # Update document in Marqo
-        self.db.client.index(self.db.flows_index).update_documents([{
-            "_id": flow_id,
-            "status": ActionExecutionStatus.RUNNING
-        }])
-        
-        # Continue flow execution with new inputs
-        return await self.execute_flow(flow_id, additional_inputs)
 
-    async def execute_flow(self, flow_id: str, initial_inputs: Dict) -> FlowExecution:
-        flow_execution = FlowExecution(flow_id, initial_inputs or {})
+        if execution_id is None:
+                # Only the latest run is continued, an older failure was superseded
+            latest = await self.db.search_executions_by_flow(flow_id, limit=1)
+            if latest and latest[0]["status"] == ActionExecutionStatus.FAILED:
+                return await self.db.get_execution(latest[0]["_id"])
+            return None
+
+        execution = await self.db.get_execution(execution_id)
+        if not execution or execution.get("flow_id") != flow_id:
+            raise ValueError(f"Execution {execution_id} not found")
+        if execution["status"] != ActionExecutionStatus.FAILED:
+            raise ExecutionConflictError(
+                f"Execution {execution_id} is {_plain(execution['status'])}, only failed executions can be resumed")
+        return execution
+
+    async def execute_flow(self, flow_id: str, initial_inputs: Dict,
+                           execution_id: Optional[str] = None,
+                           resume: bool = False) -> FlowExecution:
+        """Run a flow's action graph, recording every step as it progresses.
+
+        Each finished action's output is checkpointed in its step record.
+        With ``resume`` the stored steps of ``execution_id`` are reused:
+        completed actions are not run again, actions whose Skyvern task was
+        still running are re-attached to that task, and the rest run anew.
+        """
+        with metrics.timed("execution_seconds", "flow.execute",
+                           {"flow_id": flow_id, "execution_id": execution_id or "",
+                            "resume": resume},
+                           in_flight="executions_in_flight", status="completed"):
+            return await self._execute_flow(flow_id, initial_inputs, execution_id, resume)
+
+    async def _execute_flow(self, flow_id: str, initial_inputs: Dict,
+                            execution_id: Optional[str], resume: bool) -> FlowExecution:
+        flow_execution = FlowExecution(flow_id, initial_inputs or {}, id=execution_id)
         flow_execution.started_at = datetime.now().isoformat()
         flow_execution.status = ActionExecutionStatus.RUNNING
         flow_execution.outputs = {}
 
         # Get flow details
-        flow_result = self.db.client.index(self.db.flows_index).get_document(flow_id)
-        flow_actions = json.loads(flow_result["actions"])
-        
-        current_inputs = initial_inputs or {}
-        accumulated_outputs = {}
+        flow_result = await self.db.get_flow(flow_id)
+        if not flow_result:
+            raise ValueError(f"Flow {flow_id} not found")
+        graph = build_action_graph(flow_result["actions"])
+        actions = await self.block_manager.get_actions(
+            [action_config["id"] for action_config in graph.values()])
+
+        # Latest stored step of each graph node of the execution being resumed
+        checkpoints: Dict[str, ActionExecution] = {}
+        previous = await self.db.get_execution(execution_id) if resume and execution_id else None
+        if previous:
+            flow_execution.initial_inputs = {**(previous.get("initial_inputs") or {}),
+                                             **flow_execution.initial_inputs}
+            flow_execution.started_at = previous.get("started_at") or flow_execution.started_at
+            flow_execution.action_executions = [
+                ActionExecution.from_dict(step)
+                for step in sorted(previous["action_executions"], key=lambda step: step["step"])]
+            for action_execution in flow_execution.action_executions:
+                if action_execution.node_key in graph:
+                    checkpoints[action_execution.node_key] = action_execution
+
+        # One execution record per run, later changes are partial updates
+        if execution_id:
+            await self.db.update_execution(flow_execution.id, {
+                "flow_id": flow_id,
+                "initial_inputs": json.dumps(flow_execution.initial_inputs),
+                "status": flow_execution.status,
+                "started_at": flow_execution.started_at
+            })
+        else:
+            await self.db.store_execution(flow_execution.to_dict())
+        self._publish_execution(flow_execution)
 
-        for action_config in flow_actions:
-            action = await self.block_manager.get_action(action_config["id"])
-            
-            task_inputs = dict(current_inputs)
-            if accumulated_outputs:
-                task_inputs.update(accumulated_outputs)
-            
-            task = await self.skyvern.create_task(
-                url=action["url"],
-                navigation_goal=action["navigation_goal"],
-                data_extraction_goal=action["data_extraction_goal"],
-                navigation_payload=task_inputs
-            )
+        current_inputs = flow_execution.initial_inputs
+        node_outputs: Dict[str, Dict] = {}
+        done = {key: asyncio.Event() for key in graph}
+        flow_semaphore = asyncio.Semaphore(self.max_parallel_actions)
 
-            # Create action execution record
-            action_execution = ActionExecution(action_config["id"], task_inputs)
-            action_execution.started_at = datetime.now().isoformat()
-            action_execution.status = ActionExecutionStatus.RUNNING
-            action_execution.skyvern_task_id = task["task_id"]
-            
-            # Wait for task completion
-            task_result = await self.skyvern.wait_for_completion(task["task_id"])
-            
-            # Update action execution with results
-            action_execution.completed_at = datetime.now().isoformat()
-            action_execution.status = ActionExecutionStatus.COMPLETED
-            
-            # Safely extract output
-            output = task_result.get("extracted_information", {}) if task_result else {}
-            action_execution.output = output
-            flow_execution.outputs[action_execution.id] = output
-            
-            # Safely accumulate outputs
-            # if output:
-            #     accumulated_outputs.update(output)
-            
-            flow_execution.action_executions.append(action_execution)
-            await self.db.store_execution(flow_execution.to_dict())
+        async def run_node(key: str, action_config: Dict) -> None:
+            # Wait for every upstream action whose output this one consumes
+            for dependency in action_config["depends_on"]:
+                await done[dependency].wait()
+
+            task_inputs = dict(current_inputs)
+            for dependency in action_config["depends_on"]:
+                output = node_outputs.get(dependency)
+                if isinstance(output, dict):
+                    task_inputs.update(output)
+                elif output is not None:
+                    task_inputs[dependency] = output
+
+            action_execution = checkpoints.get(key)
+            if action_execution is None or \
+                    action_execution.status != ActionExecutionStatus.COMPLETED:
+                async with flow_semaphore, self.action_semaphore:
+                    with metrics.timed("action_seconds", "flow.action",
+                                       {"action_id": action_config["id"], "node": key,
+                                        "execution_id": flow_execution.id},
+                                       in_flight="actions_in_flight", status="completed"):
+                        action_execution = await self._run_action(
+                            flow_execution, action_config, actions.get(action_config["id"]),
+                            task_inputs, action_execution)
+
+            node_outputs[key] = action_execution.output
+            flow_execution.outputs[action_execution.id] = action_execution.output
+            done[key].set()
+
+        tasks = [asyncio.create_task(run_node(key, config))
+                 for key, config in graph.items()]
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # Shutdown: the header stays RUNNING and the steps as they are,
+            # so ExecutionQueue.recover resumes the run on the next start
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Siblings cancelled mid-run would otherwise stay "running"
+            for action_execution in flow_execution.action_executions:
+                if action_execution.status in (ActionExecutionStatus.PENDING,
+                                               ActionExecutionStatus.RUNNING):
+                    action_execution.status = ActionExecutionStatus.FAILED
+                    action_execution.error = "Cancelled after another action failed"
+                    action_execution.completed_at = datetime.now().isoformat()
+                    await self._record_step(flow_execution, action_execution)
+            flow_execution.completed_at = datetime.now().isoformat()
+            flow_execution.status = ActionExecutionStatus.FAILED
+            flow_execution.error = str(e) or type(e).__name__
+            await self.db.update_execution(flow_execution.id, {
+                "status": flow_execution.status,
+                "error": flow_execution.error,
+                "step_count": len(flow_execution.action_executions),
+                "completed_at": flow_execution.completed_at
+            })
+            self._publish_execution(flow_execution)
+            raise
 
         flow_execution.completed_at = datetime.now().isoformat()
         flow_execution.status = ActionExecutionStatus.COMPLETED
-        await self.db.store_execution(flow_execution.to_dict())
+        await self.db.update_execution(flow_execution.id, {
+            "status": flow_execution.status,
+            "step_count": len(flow_execution.action_executions),
+            "completed_at": flow_execution.completed_at
+        })
+        self._publish_execution(flow_execution)
 
         return flow_execution
 
+    def _publish_execution(self, flow_execution: FlowExecution) -> None:
+        if self.events:
+            self.events.publish(flow_execution.id, {
+                "type": "execution",
+                "execution_id": flow_execution.id,
+                "flow_id": flow_execution.flow_id,
+                "status": _plain(flow_execution.status),
+                "error": flow_execution.error,
+                "started_at": flow_execution.started_at,
+                "completed_at": flow_execution.completed_at
+            })
+
+    async def _record_step(self, flow_execution: FlowExecution,
+                           action_execution: ActionExecution) -> None:
+        step = action_execution.to_dict()
+        await self.db.store_execution_step(flow_execution.id, step)
+        if self.events:
+            self.events.publish(flow_execution.id, {
+                "type": "action",
+                "execution_id": flow_execution.id,
+                "action_execution": step
+            })
+
+    async def _run_action(self, flow_execution: FlowExecution, action_config: Dict,
+                          action: Optional[Dict], task_inputs: Dict,
+                          action_execution: Optional[ActionExecution] = None) -> ActionExecution:
+        """Run one graph node, or finish the unfinished step of a resumed run."""
+        reattach = action_execution is not None and action_execution.skyvern_task_id and \
+            action_execution.status == ActionExecutionStatus.RUNNING
+        if action_execution is None:
+            # Create action execution record
+            action_execution = ActionExecution(action_config["id"], task_inputs,
+                                               step=len(flow_execution.action_executions),
+                                               node_key=action_config["key"])
+            flow_execution.action_executions.append(action_execution)
+            await self._record_step(flow_execution, action_execution)
+            await self.db.update_execution(flow_execution.id, {
+                "step_count": len(flow_execution.action_executions)
+            })
+        elif not reattach:
+            # Failed or never started, run it again in the same step record
+            action_execution.inputs = task_inputs
+            action_execution.status = ActionExecutionStatus.PENDING
+            action_execution.skyvern_task_id = None
+            action_execution.error = None
+            action_execution.started_at = action_execution.completed_at = None
+            await self._record_step(flow_execution, action_execution)
+
+        try:
+            if action is None:
+                raise ValueError(f"Action {action_config['id']} not found")
+
+            ttl = self.result_cache.ttl_for(action) if self.result_cache else 0
+
+            async def task_started(task_id: str) -> None:
+                # A failed sibling already closed this step and the execution
+                if flow_execution.status != ActionExecutionStatus.RUNNING:
+                    return
+                action_execution.started_at = datetime.now().isoformat()
+                action_execution.status = ActionExecutionStatus.RUNNING
+                action_execution.skyvern_task_id = task_id
+                await self._record_step(flow_execution, action_execution)
+
+            if reattach:
+                # The Skyvern task outlived the previous run, wait for it
+                run = {"task_id": action_execution.skyvern_task_id,
+                       "result": await self.skyvern.wait_for_completion(
+                           action_execution.skyvern_task_id)}
+            elif ttl > 0:
+                run, action_execution.cache_hit = await self.result_cache.run(
+                    action_config["id"], task_inputs, ttl,
+                    lambda started: self._run_task(action, task_inputs, started),
+                    on_started=task_started)
+                if action_execution.cache_hit:
+                    action_execution.started_at = action_execution.started_at or \
+                        datetime.now().isoformat()
+                    action_execution.skyvern_task_id = run["task_id"]
+            else:
+                run = await self._run_task(action, task_inputs, task_started)
+            task_result = run["result"]
+        except Exception as e:
+            action_execution.completed_at = datetime.now().isoformat()
+            action_execution.status = ActionExecutionStatus.FAILED
+            action_execution.error = str(e) or type(e).__name__
+            await self._record_step(flow_execution, action_execution)
+            raise
+
+        # Update action execution with results
+        action_execution.completed_at = datetime.now().isoformat()
+        action_execution.status = ActionExecutionStatus.COMPLETED
+
+        # Safely extract output
+        action_execution.output = task_result.get("extracted_information", {}) if task_result else {}
+        await self._record_step(flow_execution, action_execution)
+        return action_execution
+
+    async def _run_task(self, action: Dict, task_inputs: Dict,
+                        started: Callable[[str], Awaitable[None]]) -> Dict:
+        """Create the Skyvern task and wait for it, reporting its ID to ``started``.
+
+        This may run shared by several steps (see ActionResultCache), so it
+        leaves step records to the callers.
+        """
+        task = await self.skyvern.create_task(
+            url=action["url"],
+            navigation_goal=action["navigation_goal"],
+            data_extraction_goal=action["data_extraction_goal"],
+            navigation_payload=task_inputs
+        )
+        await started(task["task_id"])
+
+        # Wait for task completion
+        task_result = await self.skyvern.wait_for_completion(task["task_id"])
+        return {"task_id": task["task_id"], "result": task_result}
+
+    async def create_flow_from_prompt(self, prompt: str, initial_inputs: Dict = None,
+                                      planner: Optional[str] = None) -> Dict:
+        planner = planner or self.planner
+        if planner not in ("pipeline", "single_pass"):
+            raise ValueError(f"Unknown planner: {planner}")
+        with metrics.timed("flow_planning_seconds", "flow.plan",
+                           planner=planner, status="completed"):
+            if planner == "single_pass":
+                return await self.create_flow_single_pass(prompt, initial_inputs)
+            return await self.create_flow_pipeline(prompt, initial_inputs)
+
+    async def create_flow_single_pass(self, prompt: str, initial_inputs: Dict = None) -> Dict:
+        """Plan a flow with one streamed tool-use call.
+
+        Candidate actions are retrieved up front, then Claude emits one
+        ``add_step`` call per action; each step is resolved (reused action,
+        new action on a known block, or a new block) as soon as its call is
+        complete, while the rest of the plan is still streaming.
+        """
+        candidates = await self.db.search_actions(prompt)
+        candidate_ids = {candidate["_id"] for candidate in candidates}
+
+        planning_system = """
+            Plan the sequence of website actions needed to accomplish the user request.
+            Call add_step once per action, in execution order. Reuse an existing
+            action by its action_id whenever it fits; otherwise give url, name,
+            navigation_goal, data_extraction_goal and required_inputs for a new one.
+            Only set depends_on when a step needs the output of an earlier step.
+            For navigation goals, don't click buttons like "Find Me" to find location
+            and other similar actions which will lead nowhere. Close popups which are
+            not required but try to stick close to our main goal.
+            Finally call finish_flow with a name, a description, and any values for
+            required inputs that appear in the user request.
+            """
+        planning_prompt = f"""
+            User request: {prompt}
+            Existing actions:
+            {compact_json([compact_action(candidate) for candidate in candidates])}
+            """
+
+        resolutions = []
+        keys = []
+        finish = None
+        try:
+            async for call in self.llm.stream_tool_calls(planning_prompt, PLANNER_TOOLS,
+                                                         system=planning_system,
+                                                         stage="single_pass"):
+                if call["name"] == "add_step":
+                    step = call["input"]
+                    if step["key"] in keys:
+                        raise ValueError(f"Planned step key {step['key']} is used twice")
+                    # Only earlier steps can be waited for, which also rules out cycles
+                    step = {**step, "depends_on": [key for key in dict.fromkeys(
+                        step.get("depends_on") or []) if key in keys]}
+                    keys.append(step["key"])
+                    resolutions.append(asyncio.create_task(
+                        self._resolve_planned_step(step, candidate_ids)))
+                elif call["name"] == "finish_flow":
+                    finish = call["input"]
+            if finish is None:
+                raise ValueError("The plan ended without a finish_flow call")
+
+            action_configs = await asyncio.gather(*resolutions)
+        except BaseException:
+            # A failed stream or step leaves no resolutions running behind
+            for resolution in resolutions:
+                resolution.cancel()
+            await asyncio.gather(*resolutions, return_exceptions=True)
+            raise
+        flow = await self.create_flow(
+            name=finish.get("flow_name", "Flow"),
+            description=finish.get("flow_description", prompt),
+            action_configs=list(action_configs)
+        )
 
-    async def create_flow_from_prompt(self, prompt: str, initial_inputs: Dict = None) -> Dict:
-        analysis_prompt = f"""
-            Given this user request: {prompt}
-            Determine the sequence of actions needed to accomplish this task.
+        if initial_inputs is None:
+            initial_inputs = {}
+        for name, value in (finish.get("inputs") or {}).items():
+            initial_inputs.setdefault(name, value)
+        missing_inputs = await self.missing_inputs_for(flow["actions"], initial_inputs)
+        if missing_inputs:
+            raise ValueError(f"Missing required inputs: {missing_inputs}")
+
+        return flow
+
+    async def _resolve_planned_step(self, step: Dict, candidate_ids: Set[str]) -> Dict:
+        action_config = {"key": step["key"], "depends_on": list(step.get("depends_on") or [])}
+        if step.get("action_id") in candidate_ids:
+            return {"id": step["action_id"], **action_config}
+        if not step.get("url"):
+            raise ValueError(f"Planned step {step['key']} has no known action_id or url")
+        # Only the key is required by the tool schema, as reused actions need no goals
+        missing = [name for name in ("navigation_goal", "data_extraction_goal") if not step.get(name)]
+        if missing:
+            raise ValueError(f"Planned step {step['key']} describes a new action without {missing}")
+        new_action = {
+            "name": step.get("name") or step["key"],
+            "navigation_goal": step["navigation_goal"],
+            "data_extraction_goal": step["data_extraction_goal"],
+            "required_inputs": step.get("required_inputs") or [],
+            "url": step["url"]
+        }
+
+        block, created = await self.block_manager.find_or_create_block(
+            name=f"Block for {new_action['name']}",
+            url=step["url"],
+            acts=json.dumps([new_action])
+        )
+        if created:
+            action_id = block["actions"][0]
+        else:
+            [action_id] = await self.block_manager.store_actions([{
+                "block_id": block["_id"],
+                **new_action,
+                "output_schema": {}
+            }])
+        return {"id": action_id, **action_config}
+
+    async def create_flow_pipeline(self, prompt: str, initial_inputs: Dict = None) -> Dict:
+        analysis_system = """
+            Determine the sequence of actions needed to accomplish the user request.
             For each action, specify:
             1. Website URL
             2. Action name
@@ -516,102 +3289,100 @@ class WebsiteFlowManager:
             
             Just give me the JSON output, no other text
             Return as JSON with this structure:
-            {{
+            {
                 "flow_name": "name",
                 "flow_description": "description",
                 "actions": [
-                    {{
+                    {
                         "url": "website_url",
                         "name": "action_name",
                         "navigation_goal": "goal",
                         "data_extraction_goal": "goal",
                         "required_inputs": ["input1", "input2"]
-                    }}
+                    }
                 ]
-            }}
+            }
             """
 
-        response = self.llm.client.messages.create(
-            max_tokens=4096,
-            model="claude-3-5-sonnet-20241022",
-            messages=[{"role": "user", "content": analysis_prompt}]
-        )
-        flow_plan = json.loads(response.content[0].text)
+        flow_plan = await self.llm.complete_json(
+            f"User request: {prompt}", max_tokens=4096, cache_stage="plan",
+            semantic_key=prompt, system=analysis_system)
 
-        action_configs = []
-        found_actions = []
+        semaphore = asyncio.Semaphore(self.planning_concurrency)
 
-        for action_plan in flow_plan["actions"]:
-            blocks_search = await self.db.search_blocks(action_plan["url"])
-
-            if blocks_search and len(blocks_search) > 0:
-                search_query = f"{action_plan['name']} {action_plan['navigation_goal']} {action_plan['data_extraction_goal']}"
-                existing_actions = await self.db.search_actions(search_query)
-
-                if existing_actions and len(existing_actions) > 0:
-                    best_match = existing_actions[0]
-                    action_configs.append({"id": best_match["_id"]})
-                    found_actions.append(best_match)
-                    continue
-            else:
-                block = await self.block_manager.create_block(
+        async def resolve(action_plan: Dict) -> Optional[tuple]:
+            async with semaphore:
+                block, created = await self.block_manager.find_or_create_block(
                     name=f"Block for {action_plan['name']}",
                     url=action_plan["url"],
                     acts=''
                 )
+
+                if not created:
+                    search_query = f"{action_plan['name']} {action_plan['navigation_goal']} {action_plan['data_extraction_goal']}"
+                    existing_actions = await self.db.search_actions(search_query)
+
+                    if existing_actions and len(existing_actions) > 0:
+                        best_match = existing_actions[0]
+                        return {"id": best_match["_id"]}, best_match
+                    return None
+
                 action = await self.block_manager.get_action(block["actions"][0])
-                action_configs.append({"id": block["actions"][0]})
-                found_actions.append(action)
+                return {"id": block["actions"][0]}, action
+
+        # Every planned action is resolved concurrently, results keep plan order
+        action_configs = []
+        found_actions = []
+        for resolved in await asyncio.gather(*(resolve(action_plan)
+                                               for action_plan in flow_plan["actions"])):
+            if resolved:
+                action_configs.append(resolved[0])
+                found_actions.append(resolved[1])
 
         # Validate if found actions are sufficient
-        validation_prompt = f"""
-        Given this user request: {prompt}
-        And these existing actions we found:
-        {json.dumps(found_actions, indent=2)}
-        
-        Evaluate if these actions are truly relevant and sufficient for the request.
+        validation_system = """
+        Given a user request and the existing actions we found for it,
+        evaluate if these actions are truly relevant and sufficient for the request.
         RETURN ONLY THE JSON OUTPUT, NO OTHER TEXT.
         Return JSON in this format:
-        {{
+        {
             "is_sufficient": boolean,
             "missing_capabilities": [
-                {{
+                {
                     "url": "website_url",
                     "name": "action_name",
                     "navigation_goal": "goal",
                     "data_extraction_goal": "goal",
                     "required_inputs": ["input1", "input2"]
-                }}
+                }
             ]
-        }}
+        }
+        """
+        validation_prompt = f"""
+        User request: {prompt}
+        Existing actions found:
+        {compact_json([compact_action(action) for action in found_actions if action])}
         """
 
-        validation_response = self.llm.client.messages.create(
-            max_tokens=4096,
-            model="claude-3-5-sonnet-20241022",
-            messages=[{"role": "user", "content": validation_prompt}]
-        )
-        validation_result = json.loads(validation_response.content[0].text)
+        validation_result = await self.llm.complete_json(
+            validation_prompt, max_tokens=4096, cache_stage="validate",
+            system=validation_system)
 
         if not validation_result["is_sufficient"]:
+            new_actions = []
             for new_action in validation_result["missing_capabilities"]:
-                blocks_search = await self.db.search_blocks(new_action["url"])
+                existing_block = await self.block_manager.find_block(new_action["url"])
                 
-                if blocks_search and len(blocks_search) > 0:
-                    block_id = blocks_search[0]["_id"]
-                    action_data = {
-                        "block_id": block_id,
+                if existing_block:
+                    new_actions.append({
+                        "block_id": existing_block["_id"],
                         "name": new_action["name"],
                         "navigation_goal": new_action["navigation_goal"],
                         "data_extraction_goal": new_action["data_extraction_goal"],
                         "required_inputs": new_action["required_inputs"],
                         "output_schema": {},
                         "url": new_action["url"]
-                    }
-                    action_id = await self.db.store_action(action_data)
-                    action_configs.append({"id": action_id})
-                    action = await self.block_manager.get_action(action_id)
-                    found_actions.append(action)
+                    })
                 else:
                     block = await self.block_manager.create_block(
                         name=f"Block for {new_action['name']}",
@@ -622,32 +3393,53 @@ class WebsiteFlowManager:
                     action_configs.append({"id": block["actions"][0]})
                     found_actions.append(action)
 
-        optimization_prompt = f"""
-        Given this user request: {prompt}
-        And these available actions:
-        {json.dumps(found_actions, indent=2)}
-        
-        Determine the optimal sequence of actions to achieve the goal.
+            # Actions for already known sites are written in one batch
+            for action_id in await self.block_manager.store_actions(new_actions):
+                action_configs.append({"id": action_id})
+                action = await self.block_manager.get_action(action_id)
+                found_actions.append(action)
+
+        optimization_system = """
+        Given a user request and the available actions,
+        determine the optimal sequence of actions to achieve the goal.
         Only include the actions that are really reqquired for the request.
         Consider:
         1. Dependencies between actions
         2. Data flow between actions
         3. Logical order of operations
-        
-        Return only a JSON array of action IDs in the optimal order:
+
+        Return only a JSON array of steps in the optimal order. Each step names
+        an action ID and the IDs of the earlier steps whose extracted data it
+        needs; steps with no dependencies run in parallel.
         DO NOT REUTNRN ANY OTHER TEXT.
-        ["action_id1", "action_id2", ...]
+        [{"action_id": "action_id1", "depends_on": []},
+         {"action_id": "action_id2", "depends_on": ["action_id1"]}, ...]
+        """
+        optimization_prompt = f"""
+        User request: {prompt}
+        Available actions:
+        {compact_json([compact_action(action) for action in found_actions if action])}
         """
 
-        optimization_response = self.llm.client.messages.create(
-            max_tokens=4096,
-            model="claude-3-5-sonnet-20241022",
-            messages=[{"role": "user", "content": optimization_prompt}]
-        )
-
-        optimized_action_ids = json.loads(optimization_response.content[0].text)
-        final_action_configs = [{"id": action_id} for action_id in optimized_action_ids]
-        final_action_configs = list({v['id']: v for v in final_action_configs}.values())
+        optimized_steps = await self.llm.complete_json(
+            optimization_prompt, max_tokens=4096, cache_stage="optimize",
+            system=optimization_system)
+        final_action_configs = []
+        for step in optimized_steps:
+            if isinstance(step, dict):
+                action_id, depends_on = step.get("action_id"), step.get("depends_on") or []
+            else:
+                # A bare ID (replies cached before steps declared their
+                # dependencies) keeps the order by waiting for the step before
+                action_id = step
+                depends_on = [final_action_configs[-1]["key"]] if final_action_configs else []
+            keys = [config["key"] for config in final_action_configs]
+            if not action_id or action_id in keys:
+                continue
+            # Only earlier steps can be waited for, which also rules out cycles
+            final_action_configs.append({
+                "id": action_id, "key": action_id,
+                "depends_on": [key for key in dict.fromkeys(depends_on) if key in keys]})
 
         flow = await self.create_flow(
             name=flow_plan["flow_name"],
@@ -655,34 +3447,32 @@ class WebsiteFlowManager:
             action_configs=final_action_configs
         )
 
-        missing_inputs = await self.check_missing_inputs(flow["id"], initial_inputs or {})
+        missing_inputs = await self.missing_inputs_for(flow["actions"], initial_inputs or {})
         if missing_inputs:
-            input_extraction_prompt = f"""
-            From this user request: {prompt}
-            I need to find values for these inputs: {missing_inputs}
-            
+            input_extraction_system = """
+            From the user request, I need to find values for the listed inputs.
             If you can find any values in the request for these inputs, return them as JSON.
             Don't include any other extra text, just return the JSON.
             
             Format:
-            {{"input_name": "extracted_value"}}
+            {"input_name": "extracted_value"}
             
-            If no values can be found, return empty object {{}}
+            If no values can be found, return empty object {}
+            """
+            input_extraction_prompt = f"""
+            User request: {prompt}
+            Inputs: {missing_inputs}
             """
             
-            extraction_response = self.llm.client.messages.create(
-                max_tokens=1000,
-                model="claude-3-5-sonnet-20241022",
-                messages=[{"role": "user", "content": input_extraction_prompt}]
-            )
-            
-            extracted_inputs = json.loads(extraction_response.content[0].text)
+            extracted_inputs = await self.llm.complete_json(
+                input_extraction_prompt, max_tokens=1000, cache_stage="extract_inputs",
+                system=input_extraction_system)
             
             if initial_inputs is None:
                 initial_inputs = {}
             initial_inputs.update(extracted_inputs)
             
-            missing_inputs = await self.check_missing_inputs(flow["id"], initial_inputs)
+            missing_inputs = await self.missing_inputs_for(flow["actions"], initial_inputs)
             if missing_inputs:
                 raise ValueError(f"Missing required inputs: {missing_inputs}")
 
@@ -706,16 +3496,178 @@ class WebsiteFlowManager:
             "actions": action_configs
         }
 
-    async def check_missing_inputs(self, flow_id: str, provided_inputs: Dict) -> List[str]:
-        flow_result = self.db.client.index(
-            self.db.flows_index).get_document(flow_id)
-        actions = json.loads(flow_result["actions"])
+    async def missing_inputs_for(self, action_configs: List[Dict], provided_inputs: Dict) -> List[str]:
+        actions = await self.block_manager.get_actions(
+            [action_config["id"] for action_config in action_configs])
 
         missing_inputs = set()
-        for action_config in actions:
-            action = await self.block_manager.get_action(action_config["id"])
+        for action_config in action_configs:
+            action = actions[action_config["id"]]
             required_inputs = set(action["required_inputs"])
             missing = required_inputs - set(provided_inputs.keys())
             missing_inputs.update(missing)
 
-        return list(missing_inputs)
\ No newline at end of file
+        return list(missing_inputs)
+
+
+class QueueFullError(Exception):
+    """Raised when the execution queue cannot accept more jobs."""
+
+
+class ExecutionConflictError(Exception):
+    """Raised when an execution is not in a state that allows the request."""
+
+
+class ExecutionQueue:
+    """In-process job queue that runs flow executions on worker tasks.
+
+    Jobs are dicts with an execution ``id`` plus ``flow_id``,
+    ``initial_inputs``, an optional ``prompt`` (planned with the optional
+    ``planner``, which is not stored) and a ``resume`` flag. Each
+    job is stored as a queued execution record before it is enqueued, so
+    jobs still waiting when the server stops are picked up again by
+    ``recover``. An execution is only ever queued or run once at a time.
+    """
+
+    def __init__(self, db: MarqoDatabase, handler: Callable[[Dict], Awaitable[None]],
+                 workers: int = 4, max_queue: int = 100,
+                 events: Optional[ExecutionEventBus] = None):
+        self.db = db
+        self.events = events
+        self.handler = handler
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        # IDs of the executions queued or being run
+        self.active: Set[str] = set()
+        # Queue places held by submissions still writing their record
+        self._reserved = 0
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._worker_tasks = [asyncio.create_task(self._worker())
+                              for _ in range(self.workers)]
+
+    def full(self) -> bool:
+        return self.queue.maxsize > 0 and \
+            self.queue.qsize() + self._reserved >= self.queue.maxsize
+
+    async def submit(self, flow_id: Optional[str], initial_inputs: Dict,
+                     prompt: Optional[str] = None, resume: Optional[Dict] = None,
+                     planner: Optional[str] = None) -> Dict:
+        """Queue a new execution, or with ``resume`` a stored one to continue.
+
+        A resumed execution keeps its completed steps and gets
+        ``initial_inputs`` merged into its original inputs.
+        """
+        if self.full():
+            raise QueueFullError("Execution queue is full")
+
+        # Hold the place while the record is written so concurrent
+        # submissions cannot overfill the queue
+        self._reserved += 1
+        try:
+            job = await self._store_job(flow_id, initial_inputs, prompt, resume, planner)
+        finally:
+            self._reserved -= 1
+        self.queue.put_nowait(job)
+        return job
+
+    async def _store_job(self, flow_id: Optional[str], initial_inputs: Dict,
+                         prompt: Optional[str], resume: Optional[Dict],
+                         planner: Optional[str]) -> Dict:
+        if resume is None:
+            job = {
+                "id": str(uuid.uuid4()),
+                "flow_id": flow_id,
+                "initial_inputs": initial_inputs or {},
+                "prompt": prompt,
+                "planner": planner,
+                "resume": False
+            }
+            self.active.add(job["id"])
+            try:
+                await self.db.store_execution({**job, "status": ActionExecutionStatus.QUEUED})
+            except BaseException:
+                self.active.discard(job["id"])
+                raise
+        else:
+            job = {
+                "id": resume["_id"],
+                "flow_id": flow_id,
+                "initial_inputs": {**(resume.get("initial_inputs") or {}), **(initial_inputs or {})},
+                "prompt": resume.get("prompt") or None,
+                "resume": True
+            }
+            if job["id"] in self.active:
+                raise ExecutionConflictError(f"Execution {job['id']} is already queued or running")
+            self.active.add(job["id"])
+            try:
+                await self.db.update_execution(job["id"], {
+                    "status": ActionExecutionStatus.QUEUED,
+                    "initial_inputs": json.dumps(job["initial_inputs"]),
+                    "error": "",
+                    "completed_at": ""
+                })
+            except BaseException:
+                self.active.discard(job["id"])
+                raise
+        return job
+
+    async def recover(self) -> int:
+        """Re-enqueue executions left queued or running by a previous process.
+
+        Both are resumed from their checkpoints, re-attaching to Skyvern
+        tasks that were still in progress; a queued execution without any
+        steps simply runs from the start. This assumes a single server
+        process owns the executions of a database.
+        """
+        recovered = 0
+        for status in (ActionExecutionStatus.RUNNING, ActionExecutionStatus.QUEUED):
+            for hit in await self.db.search_executions_by_status(
+                    status.value, limit=self.queue.maxsize):
+                if self.full():
+                    return recovered
+                if hit["_id"] in self.active:
+                    continue
+                self.active.add(hit["_id"])
+                self.queue.put_nowait({
+                    "id": hit["_id"],
+                    "flow_id": hit.get("flow_id") or None,
+                    "initial_inputs": _decode_document("executions", hit)["initial_inputs"],
+                    "prompt": hit.get("prompt") or None,
+                    "resume": True
+                })
+                recovered += 1
+        return recovered
+
+    async def _worker(self) -> None:
+        request_priority.set(Priority.BATCH)
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.handler(job)
+            except Exception as e:
+                failure = {
+                    "status": ActionExecutionStatus.FAILED,
+                    "error": str(e),
+                    "completed_at": datetime.now().isoformat()
+                }
+                try:
+                    await self.db.update_execution(job["id"], failure)
+                except Exception:
+                    # The worker must outlive an unavailable database; the
+                    # record stays unfinished and is recovered on restart
+                    pass
+                if self.events:
+                    self.events.publish(job["id"], {
+                        "type": "execution", "execution_id": job["id"],
+                        **failure, "status": ActionExecutionStatus.FAILED.value})
+            finally:
+                self.active.discard(job["id"])
+                self.queue.task_done()
+
+    async def close(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
@@ -1,137 +1,102 @@
-Since there's no actual data provided in the prompt (empty object {}), I'll create a React component that fetches and displays both Hacker News stories and Apple stock data. Here's a modern App.jsx implementation:
+import React, { useEffect, useState } from 'react';
 
-```jsx
-import { useState, useEffect } from 'react';
-import axios from 'axios';
+// Renders the result page generated for one execution, picked with
+// ?execution=<id>. The API serves the page as JSX plus the data it imports
+// from './data.json'; the JSX is compiled in the browser with the bundled
+// @babel/standalone, which is split into its own chunk and only loaded here.
+const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8001';
+const RETRY_MS = 1000;
 
-const App = () => {
-  const [news, setNews] = useState([]);
-  const [stockData, setStockData] = useState(null);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
+export async function compileComponent(source, data) {
+  const Babel = await import('@babel/standalone');
+  // Replies sometimes wrap the code in a Markdown fence
+  const fenced = source.match(/```(?:jsx?|tsx?)?\n([\s\S]*?)```/);
+  const { code } = Babel.transform(fenced ? fenced[1] : source, {
+    presets: ['react', ['env', { modules: 'commonjs' }]],
+  });
+  const modules = { react: React, './data.json': data, './data': data };
+  const requireModule = (name) => {
+    if (!(name in modules)) {
+      throw new Error(`Generated app imports unsupported module "${name}"`);
+    }
+    return modules[name];
+  };
+  const module = { exports: {} };
+  // eslint-disable-next-line no-new-func
+  new Function('require', 'module', 'exports', 'React', code)(
+    requireModule, module, module.exports, React);
+  return module.exports.default || module.exports;
+}
 
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        setLoading(true);
-        
-        // Fetch HN top stories
-        const newsResponse = await axios.get(
-          'https://hacker-news.firebaseio.com/v0/topstories.json'
-        );
-        const topStories = newsResponse.data.slice(0, 5);
-        
-        const storyPromises = topStories.map(id =>
-          axios.get(`https://hacker-news.firebaseio.com/v0/item/${id}.json`)
-        );
-        const storyResponses = await Promise.all(storyPromises);
-        const stories = storyResponses.map(response => response.data);
-        
-        // Fetch AAPL stock data (Note: You'll need a real API key and service)
-        const stockResponse = await axios.get(
-          'https://your-stock-api-endpoint/AAPL'
-        );
-        
-        setNews(stories);
-        setStockData(stockResponse.data);
-        setError(null);
-      } catch (err) {
-        setError('Failed to fetch data');
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchData();
-  }, []);
+class ErrorBoundary extends React.Component {
+  state = { error: null };
 
-  if (loading) {
-    return (
-      <div className="min-h-screen flex items-center justify-center">
-        <div className="text-xl">Loading...</div>
-      </div>
-    );
+  static getDerivedStateFromError(error) {
+    return { error };
   }
 
-  if (error) {
-    return (
-      <div className="min-h-screen flex items-center justify-center">
-        <div className="text-xl text-red-500">{error}</div>
-      </div>
-    );
+  render() {
+    if (this.state.error) {
+      return <pre style={{ color: '#b00' }}>{String(this.state.error)}</pre>;
+    }
+    return this.props.children;
   }
+}
 
-  return (
-    <div className="container mx-auto px-4 py-8">
-      <h1 className="text-3xl font-bold mb-8">Market & News Dashboard</h1>
-      
-      <div className="grid grid-cols-1 md:grid-cols-2 gap-8">
-        {/* Stock Section */}
-        <div className="bg-white rounded-lg shadow-lg p-6">
-          <h2 className="text-2xl font-semibold mb-4">AAPL Stock</h2>
-          {stockData && (
-            <div className="space-y-2">
-              <div className="flex justify-between">
-                <span>Current Price:</span>
-                <span className="font-bold">${stockData.price}</span>
-              </div>
-              <div className="flex justify-between">
-                <span>Change:</span>
-                <span className={`font-bold ${
-                  stockData.change >= 0 ? 'text-green-500' : 'text-red-500'
-                }`}>
-                  {stockData.change > 0 ? '+' : ''}{stockData.change}%
-                </span>
-              </div>
-            </div>
-          )}
-        </div>
-
-        {/* News Section */}
-        <div className="bg-white rounded-lg shadow-lg p-6">
-          <h2 className="text-2xl font-semibold mb-4">Latest HN Stories</h2>
-          <div className="space-y-4">
-            {news.map((story) => (
-              <div key={story.id} className="border-b pb-4 last:border-b-0">
-                <a
-                  href={story.url}
-                  target="_blank"
-                  rel="noopener noreferrer"
-                  className="text-blue-600 hover:text-blue-800 font-medium"
-                >
-                  {story.title}
-                </a>
-                <div className="text-sm text-gray-600 mt-1">
-                  {story.score} points | by {story.by}
-                </div>
-              </div>
-            ))}
-          </div>
-        </div>
-      </div>
-    </div>
-  );
-};
+export default function App() {
+  const executionId = new URLSearchParams(window.location.search).get('execution');
+  const [state, setState] = useState({ status: 'loading' });
 
-export default App;
-```
+  useEffect(() => {
+    if (!executionId) {
+      return undefined;
+    }
+    let cancelled = false;
+    let timer = null;
 
-This component:
-- Uses modern React hooks (useState, useEffect)
-- Implements proper loading and error states
-- Features a responsive grid layout
-- Uses Tailwind CSS for styling
-- Handles both the HN API and (theoretical) stock API calls
-- Implements proper TypeScript-friendly JSX
-- Uses async/await for data fetching
-- Implements proper error handling
-- Features a clean, modern UI design
+    async function load() {
+      try {
+        const response = await fetch(`${API_URL}/executions/${encodeURIComponent(executionId)}/app`);
+        if (response.status === 409) {
+          // Still being generated
+          timer = setTimeout(load, RETRY_MS);
+          return;
+        }
+        if (!response.ok) {
+          throw new Error(`Loading the app failed with HTTP ${response.status}`);
+        }
+        const { component, data } = await response.json();
+        const Component = await compileComponent(component, data);
+        if (!cancelled) {
+          setState({ status: 'ready', Component });
+        }
+      } catch (error) {
+        if (!cancelled) {
+          setState({ status: 'failed', error });
+        }
+      }
+    }
 
-Note: You'll need to:
-1. Install required dependencies (axios, tailwindcss)
-2. Replace the stock API endpoint with a real one
-3. Add proper API keys if required
-4. Add proper TypeScript types if using TypeScript
+    load();
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [executionId]);
 
-The component will show a loading state while fetching data, handle errors appropriately, and display both the stock information and news stories in a clean, organized layout once loaded.
\ No newline at end of file
+  if (!executionId) {
+    return <p>Open this page with ?execution=&lt;execution id&gt; to view its result.</p>;
+  }
+  if (state.status === 'failed') {
+    return <pre style={{ color: '#b00' }}>{String(state.error)}</pre>;
+  }
+  if (state.status === 'loading') {
+    return <p>Loading…</p>;
+  }
+  const { Component } = state;
+  return (
+    <ErrorBoundary>
+      <Component />
+    </ErrorBoundary>
+  );
+}
@@ -1,8 +1,17 @@
 import { render, screen } from '@testing-library/react';
-import App from './App';
+import App, { compileComponent } from './App';
 
-test('renders learn react link', () => {
+test('asks for an execution ID', () => {
   render(<App />);
-  const linkElement = screen.getByText(/learn react/i);
-  expect(linkElement).toBeInTheDocument();
+  const hint = screen.getByText(/\?execution=/i);
+  expect(hint).toBeInTheDocument();
+});
+
+test('compiles a generated component against its data', async () => {
+  const Component = await compileComponent(
+    "```jsx\nimport data from './data.json';\n" +
+      'export default function App() { return <h1>{data.title}</h1>; }\n```',
+    { title: 'Cheapest TV' });
+  render(<Component />);
+  expect(screen.getByText('Cheapest TV')).toBeInTheDocument();
 });
@@ -0,0 +1,297 @@
+"""Offline stand-ins for the Skyvern and Anthropic APIs.
+
+Both speak just enough of the real wire format for SkyvernService and
+LLMService, with configurable latency, failure and throttling rates, so the
+system can be load tested without browser tasks or tokens.
+
+    python simulators.py skyvern --port 9001 --task-seconds 5 --failure-rate 0.05
+    python simulators.py anthropic --port 9002 --latency 0.8
+
+Point app.py at them with SKYVERN_BASE_URL=http://127.0.0.1:9001/api/v1 and
+ANTHROPIC_BASE_URL=http://127.0.0.1:9002.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import random
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+
+def sample(median: float, sigma: float) -> float:
+    """Log-normally distributed duration, ``sigma=0`` gives a constant."""
+    if median <= 0:
+        return 0.0
+    return random.lognormvariate(math.log(median), sigma) if sigma else median
+
+
+def throttled(rate: float, retry_after: float) -> None:
+    if rate and random.random() < rate:
+        raise HTTPException(status_code=429, detail="Simulated rate limit",
+                            headers={"Retry-After": f"{retry_after:g}"})
+
+
+@dataclass
+class SkyvernSimulatorConfig:
+    api_latency: float = 0.05
+    task_seconds: float = 5.0
+    task_sigma: float = 0.5
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    # Key that webhook callbacks are signed with, as SKYVERN_API_KEY
+    api_key: str = "simulator"
+
+
+def create_skyvern_app(config: SkyvernSimulatorConfig) -> FastAPI:
+    """Skyvern's ``/tasks/`` API; tasks finish after a sampled duration."""
+    tasks: Dict[str, Dict] = {}
+    webhooks = httpx.AsyncClient(timeout=10)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await webhooks.aclose()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.tasks = tasks
+
+    def snapshot(task: Dict) -> Dict:
+        status = task["status"]
+        if status == "running" and time.monotonic() >= task["finishes_at"]:
+            status = "failed" if task["fails"] else "completed"
+        result = {"task_id": task["task_id"], "status": status}
+        if status == "completed":
+            request = task["request"]
+            result["extracted_information"] = {
+                "summary": f"Simulated result of: {request.get('data_extraction_goal', '')}",
+                "inputs": request.get("navigation_payload") or {},
+                "price": round(random.uniform(10, 500), 2)
+            }
+        elif status == "failed":
+            result["failure_reason"] = "Simulated failure"
+        return result
+
+    async def send_webhook(task: Dict, url: str) -> None:
+        await asyncio.sleep(max(task["finishes_at"] - time.monotonic(), 0))
+        body = json.dumps(snapshot(task)).encode("utf-8")
+        signature = hmac.new(config.api_key.encode("utf-8"), msg=body,
+                             digestmod=hashlib.sha256).hexdigest()
+        try:
+            await webhooks.post(url, content=body, headers={
+                "Content-Type": "application/json", "x-skyvern-signature": signature})
+        except httpx.HTTPError:
+            # Like the real service, a failed callback is not retried
+            pass
+
+    @app.post("/api/v1/tasks/")
+    async def create_task(request: Request):
+        await asyncio.sleep(sample(config.api_latency, 0.3))
+        throttled(config.rate_limit_rate, config.retry_after)
+        body = await request.json()
+        task = {
+            "task_id": f"tsk_{uuid.uuid4().hex}",
+            "status": "running",
+            "request": body,
+            "finishes_at": time.monotonic() + sample(config.task_seconds, config.task_sigma),
+            "fails": random.random() < config.failure_rate
+        }
+        tasks[task["task_id"]] = task
+        if body.get("webhook_callback_url"):
+            asyncio.create_task(send_webhook(task, body["webhook_callback_url"]))
+        return {"task_id": task["task_id"], "status": "created"}
+
+    @app.get("/api/v1/tasks/{task_id}")
+    async def get_task(task_id: str):
+        await asyncio.sleep(sample(config.api_latency, 0.3))
+        throttled(config.rate_limit_rate, config.retry_after)
+        task = tasks.get(task_id)
+        if task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return snapshot(task)
+
+    return app
+
+
+@dataclass
+class AnthropicSimulatorConfig:
+    latency: float = 0.5
+    latency_sigma: float = 0.3
+    # Output pacing of streamed replies
+    tokens_per_second: float = 400.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+
+
+def _tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def simulated_reply(prompt: str, tools: Optional[List[Dict]]) -> List[Dict]:
+    """Content blocks answering one of the app's prompts with valid output."""
+    if tools:
+        candidate_ids = re.findall(r'"id":"([^"]+)"', prompt)
+        step = {"key": "lookup", "action_id": candidate_ids[0]} if candidate_ids else {
+            "key": "lookup",
+            "url": "https://shop.example.com",
+            "name": "Search products",
+            "navigation_goal": "Search for the requested product",
+            "data_extraction_goal": "Extract the name and price of the top results",
+            "required_inputs": []
+        }
+        return [
+            {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+             "name": "add_step", "input": step},
+            {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+             "name": "finish_flow", "input": {"flow_name": "Simulated flow",
+                                              "flow_description": "Planned by the simulator",
+                                              "inputs": {}}}
+        ]
+
+    instructions = prompt.lower()
+    if "suggest possible automation actions" in instructions:
+        reply = {"actions": [{
+            "name": "search_products",
+            "navigation_goal": "Search for the requested product",
+            "data_extraction_goal": "Extract the name and price of the top results",
+            "required_inputs": [],
+            "output_schema": {"name": "product name", "price": "product price"}
+        }]}
+    elif "determine the sequence of actions" in instructions:
+        reply = {"flow_name": "Simulated flow", "flow_description": "Planned by the simulator",
+                 "actions": [{
+                     "url": "https://shop.example.com",
+                     "name": "search_products",
+                     "navigation_goal": "Search for the requested product",
+                     "data_extraction_goal": "Extract the name and price of the top results",
+                     "required_inputs": []
+                 }]}
+    elif "evaluate if these actions are truly relevant" in instructions:
+        reply = {"is_sufficient": True, "missing_capabilities": []}
+    elif "json array of steps in the optimal order" in instructions:
+        # A chain through every available action
+        action_ids = list(dict.fromkeys(re.findall(r'"id":"([^"]+)"', prompt)))
+        reply = [{"action_id": action_id, "depends_on": action_ids[index - 1:index]}
+                 for index, action_id in enumerate(action_ids)]
+    elif "need to find values for" in instructions:
+        reply = {}
+    elif "create a modern react app.jsx" in instructions:
+        return [{"type": "text", "text": "export default function App() {\n"
+                                         "  return <div>Simulated app</div>;\n}\n"}]
+    elif "generate a sql query" in instructions:
+        return [{"type": "text", "text": "SELECT * FROM flows LIMIT 10"}]
+    else:
+        reply = {}
+    return [{"type": "text", "text": json.dumps(reply)}]
+
+
+def create_anthropic_app(config: AnthropicSimulatorConfig) -> FastAPI:
+    """Anthropic's Messages API, plain and streamed."""
+    app = FastAPI()
+
+    def sse(event: Dict) -> str:
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    async def stream(message: Dict, blocks: List[Dict]):
+        yield sse({"type": "message_start", "message": {
+            **message, "content": [], "stop_reason": None,
+            "usage": {**message["usage"], "output_tokens": 1}}})
+        for index, block in enumerate(blocks):
+            if block["type"] == "tool_use":
+                text = json.dumps(block["input"])
+                start = {**block, "input": {}}
+                delta = {"type": "input_json_delta", "partial_json": text}
+            else:
+                text = block["text"]
+                start = {"type": "text", "text": ""}
+                delta = {"type": "text_delta", "text": text}
+            yield sse({"type": "content_block_start", "index": index, "content_block": start})
+            await asyncio.sleep(_tokens(text) / config.tokens_per_second)
+            yield sse({"type": "content_block_delta", "index": index, "delta": delta})
+            yield sse({"type": "content_block_stop", "index": index})
+        yield sse({"type": "message_delta",
+                   "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                   "usage": {"output_tokens": message["usage"]["output_tokens"]}})
+        yield sse({"type": "message_stop"})
+
+    @app.post("/v1/messages")
+    async def create_message(request: Request):
+        body = await request.json()
+        throttled(config.rate_limit_rate, config.retry_after)
+        def text(content) -> str:
+            if isinstance(content, str):
+                return content
+            return " ".join(part.get("text", "") for part in content)
+
+        # Instructions may be in the system blocks or the user message
+        prompt = text(body.get("system") or "") + "\n" + text(body["messages"][-1]["content"])
+        blocks = simulated_reply(prompt, body.get("tools"))
+        output = "".join(json.dumps(b["input"]) if b["type"] == "tool_use" else b["text"]
+                         for b in blocks)
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": blocks,
+            "stop_reason": "tool_use" if body.get("tools") else "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": _tokens(json.dumps(body)), "output_tokens": _tokens(output)}
+        }
+
+        await asyncio.sleep(sample(config.latency, config.latency_sigma))
+        if body.get("stream"):
+            return StreamingResponse(stream(message, blocks), media_type="text/event-stream")
+        await asyncio.sleep(message["usage"]["output_tokens"] / config.tokens_per_second)
+        return message
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("service", choices=["skyvern", "anthropic"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="skyvern: median API latency")
+    parser.add_argument("--task-seconds", type=float, default=5.0, help="skyvern: median task duration")
+    parser.add_argument("--task-sigma", type=float, default=0.5)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="skyvern: fraction of failed tasks")
+    parser.add_argument("--api-key", default="simulator", help="skyvern: webhook signing key")
+    parser.add_argument("--latency", type=float, default=0.5, help="anthropic: median time to reply")
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    args = parser.parse_args()
+
+    if args.service == "skyvern":
+        app = create_skyvern_app(SkyvernSimulatorConfig(
+            api_latency=args.api_latency, task_seconds=args.task_seconds,
+            task_sigma=args.task_sigma, failure_rate=args.failure_rate,
+            rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+            api_key=args.api_key))
+    else:
+        app = create_anthropic_app(AnthropicSimulatorConfig(
+            latency=args.latency, latency_sigma=args.latency_sigma,
+            tokens_per_second=args.tokens_per_second,
+            rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after))
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Skyvern webhook callbacks, end to end against the Skyvern simulator.
+
+The simulator posts signed callbacks to app.py's /webhooks/skyvern, and the
+polling fallback is pushed far enough out that only a webhook can resolve
+the task in time.
+"""
+import asyncio
+import hashlib
+import hmac
+import importlib
+import socket
+import sys
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from core import SkyvernService
+from simulators import SkyvernSimulatorConfig, create_skyvern_app
+
+API_KEY = "webhook-test-key"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sign(body: bytes) -> str:
+    return hmac.new(API_KEY.encode("utf-8"), msg=body, digestmod=hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def app_module(monkeypatch, tmp_path):
+    """app.py configured for webhooks from a simulator on ``skyvern_port``."""
+    skyvern_port, app_port = free_port(), free_port()
+    for name, value in {
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": str(tmp_path / "webhooks.db"),
+        "SQLITE_SEMANTIC_SEARCH": "0",
+        "ANTHROPIC_API_KEY": "unused",
+        "SKYVERN_API_KEY": API_KEY,
+        "SKYVERN_BASE_URL": f"http://127.0.0.1:{skyvern_port}/api/v1",
+        "SKYVERN_WEBHOOK_URL": f"http://127.0.0.1:{app_port}/webhooks/skyvern",
+        "SKYVERN_WEBHOOK_FALLBACK": "60",
+        "GENERATED_APPS_DIR": str(tmp_path / "apps"),
+    }.items():
+        monkeypatch.setenv(name, value)
+    # app.py reads its configuration at import time
+    sys.modules.pop("app", None)
+    module = importlib.import_module("app")
+    yield module, skyvern_port, app_port
+    sys.modules.pop("app", None)
+
+
+async def serve(app, port: int):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+def test_webhook_resolves_task(app_module):
+    app, skyvern_port, app_port = app_module
+
+    async def run():
+        simulator = create_skyvern_app(SkyvernSimulatorConfig(
+            api_latency=0, task_seconds=0.2, task_sigma=0, api_key=API_KEY))
+        servers = [await serve(simulator, skyvern_port), await serve(app.app, app_port)]
+        try:
+            task = await app.skyvern.create_task("https://shop.example.com", "Open the shop",
+                                                 "Extract the price")
+            start = time.monotonic()
+            result = await app.skyvern.wait_for_completion(task["task_id"], timeout=10)
+            return result, time.monotonic() - start
+        finally:
+            await app.skyvern.close()
+            for server, serving in servers:
+                server.should_exit = True
+                await serving
+
+    result, seconds = asyncio.run(run())
+    assert result["status"] == "completed"
+    assert "price" in result["extracted_information"]
+    # Polling would only have started after the 60 s fallback delay
+    assert seconds < 10
+
+
+def test_webhook_rejects_bad_requests(app_module):
+    app = app_module[0]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            unsigned = await client.post("/webhooks/skyvern", content=b'{"task_id": "t"}')
+            not_json = await client.post("/webhooks/skyvern", content=b"not json",
+                                         headers={"x-skyvern-signature": sign(b"not json")})
+            not_object = await client.post("/webhooks/skyvern", content=b"[]",
+                                           headers={"x-skyvern-signature": sign(b"[]")})
+            return unsigned.status_code, not_json.status_code, not_object.status_code
+
+    assert asyncio.run(run()) == (401, 400, 400)
+
+
+def test_webhook_without_api_key_is_never_verified():
+    assert not SkyvernService(api_key=None).verify_webhook(b"{}", "signature")